@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# runs a program and writes its pid, and then its exit status and resource usage, to a file descriptor.
+# usage: launcher.py FD COMMAND [ARGUMENT ...]
+#
+# on linux, the peak memory that wait4 reports includes the memory of the process that forked the program.
+# oj.py itself may hold hundreds of megabytes, e.g. after validating a large output, so the programs are
+# forked by this small process instead. the peak memory of a program is at least the few megabytes of it.
+import os
+import signal
+import sys
+import threading
+import time
+
+
+# oj.py may die without killing the program, e.g. by SIGKILL. the program is killed when the launcher
+# is orphaned, so that a program without a time limit does not run forever.
+def watch_parent(parent_pid, pid):
+    while os.getppid() == parent_pid:
+        time.sleep(0.5)
+    kill_program(pid)
+
+
+def kill_program(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def main():
+    fd = int(sys.argv[1])
+    command_line = sys.argv[2:]
+    os.set_inheritable(fd, False)
+    start_time = time.time()
+    pid = os.fork()
+    if pid == 0:
+        # the program has its own process group. oj.py kills it and still gets the report of the launcher.
+        os.setpgid(0, 0)
+        try:
+            os.execvp(command_line[0], command_line)
+        except OSError as e:
+            os.write(2, ('%s: %s\n' % (command_line[0], e.strerror)).encode('utf-8', 'replace'))
+        os._exit(127)
+    try:
+        # also set here, so that the group exists when oj.py reads the pid
+        os.setpgid(pid, pid)
+    except OSError:
+        # the program has already called exec
+        pass
+    threading.Thread(target=watch_parent, args=(os.getppid(), pid), daemon=True).start()
+    try:
+        os.write(fd, ('%d\n' % pid).encode('ascii'))
+        pid, status, rusage = os.wait4(pid, 0)
+        wall_time = time.time() - start_time
+        os.write(fd, ('%d %r %r %d\n' % (status, wall_time, rusage.ru_utime + rusage.ru_stime, rusage.ru_maxrss)).encode('ascii'))
+        os.close(fd)
+    except BrokenPipeError:
+        # oj.py has gone away
+        kill_program(pid)
+        os._exit(1)
+    # the exit status of the program is passed on
+    if os.WIFSIGNALED(status):
+        try:
+            signal.signal(os.WTERMSIG(status), signal.SIG_DFL)
+        except (OSError, ValueError):
+            # SIGKILL and SIGSTOP have no handler
+            pass
+        os.kill(os.getpid(), os.WTERMSIG(status))
+        os._exit(128 + os.WTERMSIG(status))
+    os._exit(os.WEXITSTATUS(status))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import math
+import statistics
+
+def percentile(samples, p):
+    # nearest-rank method
+    ordered = sorted(samples)
+    return ordered[max(0, int(math.ceil(p / 100.0 * len(ordered))) - 1)]
+
+def summarize(samples):
+    return {'min': min(samples),
+            'median': statistics.median(samples),
+            'mean': statistics.mean(samples),
+            'p95': percentile(samples, 95),
+            'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0}
+
+complexity_models = [('O(1)', lambda n: 1.0),
+                     ('O(log N)', lambda n: math.log(n)),
+                     ('O(N)', lambda n: n),
+                     ('O(N log N)', lambda n: n * math.log(n)),
+                     ('O(N^2)', lambda n: n ** 2),
+                     ('O(N^2 log N)', lambda n: n ** 2 * math.log(n)),
+                     ('O(N^3)', lambda n: n ** 3)]
+
+def fit_complexity(sizes, values):
+    # fits value = a + b * f(n) with a, b >= 0 for every model.
+    # the models are ranked by the root mean square of the relative errors.
+    # returns a list of (score, name, predict) sorted by the score.
+    fits = []
+    for name, f in complexity_models:
+        xs = [float(f(n)) for n in sizes]
+        a, b = linear_regression(xs, values)
+        if b < 0.0:
+            a, b = statistics.mean(values), 0.0
+        elif a < 0.0:
+            a, b = 0.0, sum(x * y for x, y in zip(xs, values)) / sum(x * x for x in xs)
+        predict = (lambda a, b, f: lambda n: a + b * f(n))(a, b, f)
+        errors = [(predict(n) - value) / value for n, value in zip(sizes, values) if value > 0.0]
+        score = math.sqrt(statistics.mean([e * e for e in errors])) if errors else 0.0
+        fits.append((score, name, predict))
+    fits.sort(key=lambda fit: fit[0])
+    return fits
+
+def linear_regression(xs, ys):
+    mean_x = statistics.mean(xs)
+    mean_y = statistics.mean(ys)
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if sxx == 0.0:
+        return mean_y, 0.0
+    b = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+    return mean_y - b * mean_x, b
+
+def mann_whitney_u(xs, ys):
+    # two-sided p-value of the Mann-Whitney U test with the normal approximation and the tie correction.
+    n1 = len(xs)
+    n2 = len(ys)
+    values = sorted([(x, 0) for x in xs] + [(y, 1) for y in ys])
+    ranks = [0.0] * len(values)
+    ties = 0.0
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2.0 + 1.0
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    r1 = sum(rank for rank, (value, group) in zip(ranks, values) if group == 0)
+    u = r1 - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    variance = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0.0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2.0) - 0.5) / math.sqrt(variance)
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2.0)))
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import http.client
+import io
+import json
+import os
+import os.path
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import urllib.response
+import zlib
+
+
+def write_file_atomically(path, data):
+    # readers never see a partially written file
+    directory = os.path.dirname(path) or os.curdir
+    fd, temporary_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+    except:
+        os.remove(temporary_path)
+        raise
+
+
+class ResponseReader(io.RawIOBase):
+    # returns the connection to the pool once the body has been read to the end
+    def __init__(self, response, release):
+        self.response = response
+        self.release = release
+        if response.length == 0:
+            # no body, e.g. 204 and 304
+            response.read()
+        if response.isclosed():
+            self.release(True)
+            self.response = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.response is None:
+            return 0
+        n = self.response.readinto(b)
+        if self.response.isclosed():
+            self.release(True)
+            self.response = None
+        return n
+
+    def close(self):
+        if self.response is not None:
+            # the rest of the body is still on the wire, so the connection cannot be reused
+            self.response.close()
+            self.release(False)
+            self.response = None
+        io.RawIOBase.close(self)
+
+
+class DecodingReader(io.RawIOBase):
+    def __init__(self, fp):
+        self.fp = fp
+        # accepts both gzip and zlib headers
+        self.decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        self.buffer = b''
+        self.eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.buffer and not self.eof:
+            chunk = self.fp.read(65536)
+            if chunk:
+                self.buffer = self.decompressor.decompress(chunk)
+            else:
+                self.buffer = self.decompressor.flush()
+                self.eof = True
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+    def close(self):
+        self.fp.close()
+        io.RawIOBase.close(self)
+
+
+class KeepAliveHandlerMixin:
+    max_idle_connections = 8
+
+    def init_pool(self, decode_content):
+        self.decode_content = decode_content
+        self.idle_connections = {}
+        self.lock = threading.Lock()
+
+    def get_pool_key(self, http_class, req):
+        return (http_class, req.host, req._tunnel_host)
+
+    def acquire(self, key):
+        with self.lock:
+            connections = self.idle_connections.get(key)
+            if connections:
+                return connections.pop()
+        return None
+
+    def release(self, key, connection, reusable):
+        if reusable:
+            with self.lock:
+                connections = self.idle_connections.setdefault(key, [])
+                if len(connections) < self.max_idle_connections:
+                    connections.append(connection)
+                    return
+        connection.close()
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle_connections.values():
+                for connection in connections:
+                    connection.close()
+            self.idle_connections.clear()
+
+    def create_connection(self, http_class, req, tunnel_headers, **http_conn_args):
+        connection = http_class(req.host, timeout=req.timeout, **http_conn_args)
+        if req._tunnel_host:
+            connection.set_tunnel(req._tunnel_host, headers=tunnel_headers)
+        return connection
+
+    def send(self, connection, req, headers):
+        connection.request(req.get_method(), req.selector, req.data, headers,
+                           encode_chunked=req.has_header('Transfer-encoding'))
+        return connection.getresponse()
+
+    def do_open(self, http_class, req, **http_conn_args):
+        if not req.host:
+            raise urllib.error.URLError('no host given')
+        headers = dict(req.unredirected_hdrs)
+        headers.update((k, v) for k, v in req.headers.items() if k not in headers)
+        headers = dict((name.title(), value) for name, value in headers.items())
+        headers['Connection'] = 'keep-alive'
+        # as in urllib.request, the credentials of the proxy go to the CONNECT request when tunnelling,
+        # and stay in the request to a plain http proxy
+        tunnel_headers = {}
+        if req._tunnel_host and 'Proxy-Authorization' in headers:
+            tunnel_headers['Proxy-Authorization'] = headers.pop('Proxy-Authorization')
+        if self.decode_content and 'Accept-Encoding' not in headers:
+            headers['Accept-Encoding'] = 'gzip, deflate'
+
+        key = self.get_pool_key(http_class, req)
+        connection = self.acquire(key)
+        try:
+            if connection is not None:
+                try:
+                    response = self.send(connection, req, headers)
+                except (http.client.RemoteDisconnected, ConnectionError):
+                    # the server closed an idle connection, so retry once on a fresh one
+                    connection.close()
+                    connection = None
+            if connection is None:
+                connection = self.create_connection(http_class, req, tunnel_headers, **http_conn_args)
+                response = self.send(connection, req, headers)
+        except OSError as error:
+            connection.close()
+            raise urllib.error.URLError(error)
+        except http.client.HTTPException:
+            connection.close()
+            raise
+
+        def release(reusable):
+            self.release(key, connection, reusable and not response.will_close)
+        fp = ResponseReader(response, release)
+        encoding = response.msg.get('Content-Encoding', '').strip().lower()
+        if self.decode_content and encoding in ('gzip', 'x-gzip', 'deflate'):
+            fp = DecodingReader(fp)
+            del response.msg['Content-Encoding']
+            del response.msg['Content-Length']
+        resp = urllib.response.addinfourl(io.BufferedReader(fp), response.msg, req.get_full_url(), response.status)
+        resp.msg = response.reason
+        return resp
+
+
+class KeepAliveHTTPHandler(KeepAliveHandlerMixin, urllib.request.HTTPHandler):
+    def __init__(self, decode_content=True):
+        urllib.request.HTTPHandler.__init__(self)
+        self.init_pool(decode_content)
+
+
+class KeepAliveHTTPSHandler(KeepAliveHandlerMixin, urllib.request.HTTPSHandler):
+    def __init__(self, decode_content=True, context=None):
+        urllib.request.HTTPSHandler.__init__(self, context=context)
+        self.init_pool(decode_content)
+
+
+class HTTPCache:
+    # pages are stored with their validators and revalidated with conditional requests
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+
+    def get_path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def lookup(self, url):
+        path = self.get_path(url)
+        try:
+            with open(path + '.json') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or not os.path.exists(path + '.body'):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return entry['expires'] is not None and time.time() < entry['expires']
+
+    def add_validators(self, request, entry):
+        if entry['etag'] is not None:
+            request.add_header('If-None-Match', entry['etag'])
+        if entry['last_modified'] is not None:
+            request.add_header('If-Modified-Since', entry['last_modified'])
+
+    def read(self, url):
+        path = self.get_path(url) + '.body'
+        with open(path, 'rb') as f:
+            data = f.read()
+        # the modification time orders the entries for eviction
+        os.utime(path)
+        return data
+
+    def store(self, url, headers, data):
+        cache_control = [directive.strip().lower() for directive in headers.get('Cache-Control', '').split(',')]
+        if 'no-store' in cache_control or len(data) > self.max_size:
+            return
+        entry = {'url': url, 'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'), 'expires': None}
+        if 'no-cache' not in cache_control:
+            for directive in cache_control:
+                if directive.startswith('max-age=') and directive[8:].isdigit():
+                    entry['expires'] = time.time() + int(directive[8:])
+        if entry['etag'] is None and entry['last_modified'] is None and entry['expires'] is None:
+            # nothing to revalidate with
+            return
+        # files are created readable only by the user because pages may contain personal data
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.get_path(url)
+        write_file_atomically(path + '.body', data)
+        write_file_atomically(path + '.json', json.dumps(entry).encode('utf-8'))
+        self.evict()
+
+    def evict(self):
+        # the least recently used pages are removed until the cache fits in max_size
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.body'):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name[:-len('.body')]))
+        total = sum(size for mtime, size, key in entries)
+        for mtime, size, key in sorted(entries):
+            if total <= self.max_size:
+                break
+            for ext in ('.json', '.body'):
+                try:
+                    os.remove(os.path.join(self.directory, key + ext))
+                except OSError:
+                    pass
+            total -= size
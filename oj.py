@@ -3,10 +3,12 @@
 import argparse
 import os
 import os.path
+import sys
 
 from onlinejudge import *
 
 def main():
+    install_signal_handlers()
     usage = "usage: %(prog)s [options] ... [contest_id] problem_id"
     parser = argparse.ArgumentParser(usage=usage)
 
@@ -30,6 +32,27 @@ def main():
     command.add_argument('-d', '--download', action="store_const",
                       const='download', dest="command",
                       help="Only download the test cases")
+    command.add_argument('--prefetch-contest', action="store_const",
+                      const='prefetch_contest', dest="command",
+                      help="Download the test cases of all tasks in the contest (AtCoder)")
+    command.add_argument('--watch', action='store', nargs='+',
+                      dest='watch', default=None, metavar='SUBMISSION_ID',
+                      help='Poll the verdicts of the submissions until they are judged (AtCoder)')
+    command.add_argument('--stress', action='store', type=int,
+                      dest='stress', default=None, metavar='N',
+                      help='Compare the solution with --reference on N inputs made by --generator')
+    command.add_argument('--shrink', action='store', type=int,
+                      dest='shrink', default=None, metavar='INDEX',
+                      help='Minimize the failing test case INDEX and save it as a new test case')
+    command.add_argument('--sweep', action='store_const',
+                      const='sweep', dest='command',
+                      help='Run the solution on inputs of --sizes made by --generator and estimate the complexity')
+    command.add_argument('--compare', action='store', nargs='+',
+                      dest='compare', default=None, metavar='SOURCE[:RUNTIME]',
+                      help='Compare the speed of two or more solutions or runtimes, e.g. a.py:py3 a.py:pypy3')
+    command.add_argument('--bench', action='store', type=int,
+                      dest='bench', default=None, metavar='N',
+                      help='Run each test case N times and report statistics')
 
     # switch online judge
     # contest = parser.add_mutually_exclusive_group()
@@ -85,6 +108,70 @@ def main():
                       dest='testcase_directory', default=None,
                       help='Specify the directory for testcases')
 
+    parser.add_argument('--cache-directory', action='store',
+                      dest='cache_directory', default=None,
+                      help='Specify the directory for caches')
+    parser.add_argument('--no-compile-cache', action='store_true',
+                      dest='no_compile_cache', default=False,
+                      help='Always compile the solution')
+
+    parser.add_argument('--verify-testcases', action='store_true',
+                      dest='verify_testcases', default=False,
+                      help='Check the sizes and hashes of the test cases against the manifest')
+    parser.add_argument('--testcase-store', action='store_true',
+                      dest='testcase_store', default=None,
+                      help='Keep the test cases compressed in the cache directory')
+    parser.add_argument('--refresh', action='store_true',
+                      dest='refresh', default=False,
+                      help='Download the problem page even if a cached copy is up to date')
+    parser.add_argument('--login', action='store_true',
+                      dest='force_login', default=False,
+                      help='Log in even if a saved session exists')
+    parser.add_argument('--no-wait', action='store_true',
+                      dest='no_wait', default=False,
+                      help='Do not wait for the verdict after --submit')
+
+    parser.add_argument('-j', '--jobs', action='store', type=int,
+                      dest='jobs', default=None,
+                      help='Run N test cases in parallel')
+
+    parser.add_argument('--time-limit', action='store', type=float,
+                      dest='time_limit', default=None,
+                      help='Set the time limit per test case in seconds')
+
+    parser.add_argument('--memory-limit', action='store', type=float,
+                      dest='memory_limit', default=None,
+                      help='Set the memory limit per test case in megabytes')
+
+    parser.add_argument('--generator', action='store',
+                      dest='generator', default=None,
+                      help='Specify the source file of the input generator. It gets a seed as the first argument, and the size as the second argument with --sweep')
+    parser.add_argument('--reference', action='store',
+                      dest='reference', default=None,
+                      help='Specify the source file of the reference solution')
+    parser.add_argument('--seed', action='store', type=int,
+                      dest='seed', default=None,
+                      help='Specify the first seed for --stress')
+    parser.add_argument('--sizes', action='store',
+                      dest='sizes', default='1e3,3e3,1e4,3e4,1e5,3e5,1e6',
+                      help='Comma separated input sizes for --sweep')
+    parser.add_argument('--max-n', action='store',
+                      dest='max_n', default=None,
+                      help='Estimate the time of --sweep at this size')
+    parser.add_argument('--rounds', action='store', type=int,
+                      dest='rounds', default=5,
+                      help='Number of measured rounds for --compare')
+    parser.add_argument('--warmup', action='store', type=int,
+                      dest='warmup', default=1,
+                      help='Number of warmup runs before --bench measurements')
+    parser.add_argument('--bench-json', action='store',
+                      dest='bench_json', default=None,
+                      help='Write the --bench statistics to the JSON file')
+
+    parser.add_argument('--output-limit', action='store', type=float,
+                      dest='output_limit', default=None,
+                      help='Set the output limit per test case in megabytes')
+
     parser.add_argument("-t", "--titech-pubnet", action="store_true",
                       dest="titech_pubnet", default=False,
                       help="Use titech pubnet proxy",)
@@ -92,6 +179,16 @@ def main():
                       dest="floating_point", default=None,
                       help="Use floating point validator and set max error")
 
+    parser.add_argument('--checker', action='store',
+                      dest='checker', default=None,
+                      help='Validate with a special judge. It is called as CHECKER input output answer and uses testlib exit codes')
+    parser.add_argument('--interactive', action='store',
+                      dest='interactive', default=None, metavar='JUDGE',
+                      help='Run an interactive problem with the judge program. It is called as JUDGE input output')
+    parser.add_argument('--full-diff', action='store_true',
+                      dest='full_diff', default=False,
+                      help='Show the whole side-by-side diff of a wrong answer')
+
     parser.add_argument('--r19', action="store_true",
                       dest='r19', default=False,
                       help="use Ruby1.9 for test")
@@ -109,6 +206,22 @@ def main():
                       help="use PyPy3 for test")
 
     options = parser.parse_args()
+    if options.bench is not None:
+        if options.bench < 1:
+            parser.error("--bench needs at least 1 run")
+        if options.warmup < 0:
+            parser.error("--warmup must not be negative")
+        options.command = 'bench'
+    if options.stress is not None:
+        options.command = 'stress'
+    if options.shrink is not None:
+        options.command = 'shrink'
+    if options.compare is not None:
+        if options.rounds < 1:
+            parser.error("--rounds needs at least 1 round")
+        options.command = 'compare'
+    if options.watch is not None:
+        options.command = 'watch'
     args = options.args
     try:
         while True:
@@ -129,6 +242,33 @@ def main():
         if 'source_file_name' in setting:
             options.source_file_name = setting['source_file_name']
 
+    if options.cache_directory is None:
+        if 'cache_directory' in setting:
+            options.cache_directory = setting['cache_directory']
+        else:
+            options.cache_directory = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'onlinejudgehelper')
+
+    if options.testcase_store is None:
+        options.testcase_store = setting.get('testcase_store', False)
+
+    if options.jobs is None:
+        if 'jobs' in setting:
+            options.jobs = setting['jobs']
+        else:
+            options.jobs = 1
+
+    if options.time_limit is None:
+        if 'time_limit' in setting:
+            options.time_limit = setting['time_limit']
+
+    if options.memory_limit is None:
+        if 'memory_limit' in setting:
+            options.memory_limit = setting['memory_limit']
+
+    if options.output_limit is None:
+        if 'output_limit' in setting:
+            options.output_limit = setting['output_limit']
+
     online_judge = None
     if options.contest == "zoj_contest":
         online_judge = ZOJContest(options, args)
@@ -158,6 +298,10 @@ def main():
         online_judge = TOPSIC(options, args)
     else:
         parser.error("contest is not given")
+    if options.command == "prefetch_contest" and not isinstance(online_judge, AtCoder):
+        parser.error("--prefetch-contest is only supported for AtCoder")
+    if options.command == "watch" and not isinstance(online_judge, AtCoder):
+        parser.error("--watch is only supported for AtCoder")
 
     if options.testcase_directory is None:
         if 'testcase_directory' in setting:
@@ -167,16 +311,33 @@ def main():
     if not os.path.exists(options.testcase_directory):
         os.makedirs(options.testcase_directory)
 
-    if options.command == "submit":
-        online_judge.submit()
-    elif options.command == "create_solution_template_file":
-        online_judge.create_solution_template_file()
-    elif options.command == "download":
-        online_judge.download()
-    elif options.command == "check":
-        online_judge.check()
-    else:
-        assert False
+    try:
+        if options.command == "submit":
+            online_judge.submit()
+        elif options.command == "create_solution_template_file":
+            online_judge.create_solution_template_file()
+        elif options.command == "download":
+            online_judge.download_test_cases()
+        elif options.command == "prefetch_contest":
+            online_judge.prefetch_contest()
+        elif options.command == "check":
+            online_judge.check()
+        elif options.command == "bench":
+            online_judge.bench()
+        elif options.command == "stress":
+            online_judge.stress()
+        elif options.command == "shrink":
+            online_judge.shrink()
+        elif options.command == "sweep":
+            online_judge.sweep()
+        elif options.command == "compare":
+            online_judge.compare()
+        elif options.command == "watch":
+            online_judge.watch_submissions(options.watch)
+        else:
+            assert False
+    except LoginError as error:
+        sys.exit(str(error))
 
 if __name__ == '__main__':
     main()
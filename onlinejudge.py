@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import html
+import http.client
 import http.cookiejar
 import glob
+import io
+import concurrent.futures
+import copy
+import itertools
 import json
+import math
 import os
 import os.path
+import random
 import re
 import shutil
+import statistics
 import subprocess
 import sys
+import tempfile
 import time
 import urllib.request, urllib.parse, urllib.error
 import urllib.request, urllib.error, urllib.parse
@@ -27,8 +37,18 @@ except:
 
 from validator import *
 from solution import *
+from testcase import *
+from measurement import *
+from network import *
+from sample import *
+
+class LoginError(Exception):
+    pass
 
 class OnlineJudge:
+    contest_id = None
+    min_poll_interval = 0.5
+    max_poll_interval = 8.0
     def __init__(self, options, problem_id):
         self.options = options
         self.problem_id = problem_id
@@ -57,39 +77,150 @@ class OnlineJudge:
         else:
             return self.problem_id + '.cpp'
 
+    # the text of a sample ends with exactly one newline. an empty sample stays empty.
     def format_pre(self, s):
-        s = s.replace('<br />', '\n')
-        s = s.replace('&lt;', '<')
-        s = s.replace('&gt;', '>')
-        s = s.replace('&quot;', '"')
-        s = s.replace('\r', '')
-        if not s.endswith('\n'):
+        s = s.replace('\r', '').strip('\n')
+        if s:
             s += '\n'
-        while s.endswith('\n\n'):
-            s = s[0:len(s) - 1]
-        while s.startswith('\n'):
-            s = s[1:]
         return s
 
-    def download_html(self):
-        url = self.get_url()
-        return self.get_opener().open(url).read()
+    def get_http_cache(self):
+        return HTTPCache(os.path.join(self.options.cache_directory, 'http'))
+
+    def download_html(self, url=None):
+        if url == None:
+            url = self.get_url()
+        cache = self.get_http_cache()
+        entry = None
+        if not self.options.refresh:
+            entry = cache.lookup(url)
+        if entry != None and cache.is_fresh(entry):
+            return cache.read(url)
+        request = urllib.request.Request(url)
+        if entry != None:
+            cache.add_validators(request, entry)
+        try:
+            response = self.open_with_session(request)
+        except urllib.error.HTTPError as error:
+            if error.code != 304 or entry == None:
+                raise
+            # not modified
+            error.read()
+            return cache.read(url)
+        data = response.read()
+        cache.store(url, response.headers, data)
+        return data
+
+    def get_sample_extractor(self):
+        return SampleExtractor()
 
     def download(self):
+        samples = self.get_sample_extractor().extract(self.download_html().decode('utf-8', 'replace'))
+        for index, (input_text, output_text) in enumerate(samples):
+            open(self.get_input_file_path(index), 'w').write(self.format_pre(input_text))
+            open(self.get_output_file_path(index), 'w').write(self.format_pre(output_text))
+        return True
+
+    def prefetch_contest(self):
         raise NotImplementedError
 
     def get_opener(self):
         if self.opener == None:
-            cj = http.cookiejar.CookieJar()
+            cj = self.load_cookies()
             cjhdr = urllib.request.HTTPCookieProcessor(cj)
-            if self.proxies == None:
-                self.opener = urllib.request.build_opener(cjhdr)
-            else:
-                self.opener = urllib.request.build_opener(cjhdr, urllib.request.ProxyHandler(self.proxies))
+            # connections are kept alive and shared by all requests made through the opener
+            handlers = [cjhdr, KeepAliveHTTPHandler(), KeepAliveHTTPSHandler()]
+            if self.proxies != None:
+                handlers.append(urllib.request.ProxyHandler(self.proxies))
+            self.opener = urllib.request.build_opener(*handlers)
+            self.cookie_jar = cj
+            if self.get_login_url() != None and (self.options.force_login or not self.has_session()):
+                # public pages can still be read without a session
+                self.start_session()
         return self.opener
 
-    def get_solution(self):
-        source_file_name = self.get_source_file_name()
+    def start_session(self):
+        if not self.login():
+            print('Login failed: ' + self.get_login_url())
+            return False
+        self.save_cookies()
+        return True
+
+    # opens a page that needs the session. if the saved session was rejected and the request was
+    # redirected to the login page, the judge logs in again and the request is sent once more.
+    def open_with_session(self, request, data=None):
+        response = self.get_opener().open(request, data)
+        if not self.is_login_page(response):
+            return response
+        response.read()
+        if not self.start_session():
+            raise LoginError('the request needs a login: ' + response.geturl())
+        response = self.opener.open(request, data)
+        if self.is_login_page(response):
+            raise LoginError('the session was rejected: ' + response.geturl())
+        return response
+
+    def is_login_page(self, response):
+        return self.get_login_url() != None and response.geturl().startswith(self.get_login_url())
+
+    # a login that was rejected shows the login page again
+    def login_succeeded(self, response):
+        response.read()
+        return not self.is_login_page(response) and self.has_session()
+
+    # judges that need a login return the url of the login page
+    def get_login_url(self):
+        return None
+
+    # returns whether the login succeeded
+    def login(self):
+        raise NotImplementedError
+
+    # the cookie that holds the session on the judge. None accepts any cookie of the login host.
+    def get_session_cookie_name(self):
+        return None
+
+    def get_cookie_file_path(self):
+        return os.path.join(self.options.cache_directory, 'cookies', self.__class__.__name__ + '.txt')
+
+    def load_cookies(self):
+        cj = http.cookiejar.LWPCookieJar(self.get_cookie_file_path())
+        if os.path.exists(cj.filename):
+            try:
+                # expired cookies are dropped while loading
+                cj.load(ignore_discard=True)
+            except (http.cookiejar.LoadError, OSError):
+                cj.clear()
+        return cj
+
+    def save_cookies(self):
+        os.makedirs(os.path.dirname(self.cookie_jar.filename), exist_ok=True)
+        # the file holds the session, so it is created readable only by the user
+        data = '#LWP-Cookies-2.0\n' + self.cookie_jar.as_lwp_str(ignore_discard=True)
+        write_file_atomically(self.cookie_jar.filename, data.encode('utf-8'))
+
+    # a saved session is assumed to be valid while its session cookie has not expired
+    def has_session(self):
+        host = urllib.parse.urlsplit(self.get_login_url()).hostname
+        name = self.get_session_cookie_name()
+        return any(http.cookiejar.domain_match(host, cookie.domain) and not cookie.is_expired()
+                   and (name == None or cookie.name == name)
+                   for cookie in self.cookie_jar)
+
+    def get_runtimes(self):
+        return [runtime for runtime in ('r19', 'topaz', 'py3', 'pypy', 'pypy3') if getattr(self.options, runtime)]
+
+    def get_solution(self, source_file_name=None, runtimes=None):
+        if source_file_name is None:
+            source_file_name = self.get_source_file_name()
+        if runtimes is None:
+            runtimes = self.get_runtimes()
+        solution = self.create_solution(source_file_name, runtimes)
+        if not self.options.no_compile_cache:
+            solution.compile_cache_directory = os.path.join(self.options.cache_directory, 'compile')
+        return solution
+
+    def create_solution(self, source_file_name, runtimes):
         ext = os.path.splitext(source_file_name)[1]
         if ext == '.c':
             return SolutionC(source_file_name)
@@ -102,20 +233,20 @@ class OnlineJudge:
         elif ext == '.php':
             return SolutionPhp(source_file_name)
         elif ext == '.py':
-            if self.options.py3:
+            if 'py3' in runtimes:
                 return SolutionPython3(source_file_name)
-            elif self.options.pypy:
+            elif 'pypy' in runtimes:
                 return SolutionPyPy(source_file_name)
-            elif self.options.pypy3:
+            elif 'pypy3' in runtimes:
                 return SolutionPyPy3(source_file_name)
             else:
                 return SolutionPython(source_file_name)
         elif ext == '.pl':
             return SolutionPerl(source_file_name)
         elif ext == '.rb':
-            if self.options.r19:
+            if 'r19' in runtimes:
                 return SolutionRuby19(source_file_name)
-            if self.options.topaz:
+            if 'topaz' in runtimes:
                 return SolutionRubyTopaz(source_file_name)
             else:
                 return SolutionRuby(source_file_name)
@@ -134,74 +265,904 @@ class OnlineJudge:
         else:
             return Solution(source_file_name)
 
-    def get_validator(self):
-        if not self.options.floating_point:
-            return DiffValidator()
+    def get_validator(self, verbose=True):
+        if self.options.checker:
+            return CheckerValidator(self.get_solution(self.options.checker), verbose)
+        elif not self.options.floating_point:
+            return DiffValidator(verbose, self.options.full_diff)
         else:
-            return FloatingPointValidator(self.options.floating_point)
+            return FloatingPointValidator(self.options.floating_point, verbose)
+
+    def get_test_cases(self, require_output=True):
+        if self.options.testcase_store:
+            test_cases = self.get_testcase_store().load(self.get_problem_key())
+            if test_cases is not None:
+                return [test_case for test_case in test_cases if test_case.has_output() or not require_output]
+        return self.get_local_test_cases(require_output)
+
+    def get_test_cases_or_download(self, require_output=True):
+        test_cases = self.get_test_cases(require_output)
+        if not test_cases:
+            print('downloading...')
+            self.download_test_cases()
+            test_cases = self.get_test_cases(require_output)
+        return test_cases
+
+    # the manifest is only read here. the cases added by hand are listed when the manifest is written next.
+    def get_local_test_cases(self, require_output=True):
+        listing = DirectoryListing()
+        cases = self.read_manifest_cases()
+        if cases is None:
+            # files downloaded before manifests were written
+            return self.probe_test_cases(require_output, listing)
+        test_cases = self.read_manifest(cases, listing) + self.find_unlisted_test_cases(cases, listing)
+        return [test_case for test_case in test_cases if test_case.output_file_path is not None or not require_output]
+
+    def probe_test_cases(self, require_output=True, listing=None):
+        if listing is None:
+            listing = DirectoryListing()
+        test_cases = []
+        while True:
+            index = len(test_cases)
+            input_file_path = self.get_input_file_path(index)
+            output_file_path = self.get_output_file_path(index)
+            if not listing.exists(input_file_path):
+                break
+            if require_output and not listing.exists(output_file_path):
+                break
+            case_name = input_file_path.rsplit('.in.txt', 1)[0]
+            test_cases.append(TestCase(case_name, input_file_path, output_file_path))
+        return test_cases
+
+    # names the manifest and the stored cases of the problem. problems of different contests do not share them.
+    def get_problem_key(self):
+        if self.contest_id is None:
+            return self.__class__.__name__ + '.' + self.problem_id
+        return self.__class__.__name__ + '.' + self.contest_id + '.' + self.problem_id
+
+    def get_testcase_store(self):
+        return TestCaseStore(os.path.join(self.options.cache_directory, 'testcases'))
+
+    def get_manifest_path(self):
+        return os.path.join(self.options.testcase_directory, self.get_problem_key() + '.manifest.json')
+
+    # the manifest lists the cases with their sizes and hashes, so the cases are found without probing the files.
+    # the numbering may have gaps.
+    def write_manifest(self, test_cases):
+        self.save_manifest([self.get_manifest_entry(test_case) for test_case in test_cases])
+
+    def save_manifest(self, cases):
+        write_file_atomically(self.get_manifest_path(), json.dumps({'cases': cases}, indent=1).encode('utf-8'))
+
+    def get_manifest_entry(self, test_case):
+        directory = self.options.testcase_directory
+        case = {'name': os.path.relpath(test_case.name, directory)}
+        for key, path in (('input', test_case.input_file_path), ('output', test_case.output_file_path)):
+            if path is not None and os.path.exists(path):
+                size, digest = hash_file(path)
+                case.update({key: os.path.relpath(path, directory), key + '_size': size, key + '_sha256': digest})
+            else:
+                case[key] = None
+        return case
+
+    # returns None if there is no manifest
+    def read_manifest_cases(self):
+        try:
+            with open(self.get_manifest_path()) as f:
+                return json.load(f)['cases']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # the listed cases whose files were removed are skipped
+    def read_manifest(self, cases, listing):
+        directory = self.options.testcase_directory
+        test_cases = []
+        for case in cases:
+            test_case = TestCase(os.path.join(directory, case['name']), os.path.join(directory, case['input']),
+                                 os.path.join(directory, case['output']) if case['output'] else None)
+            if not all(listing.exists(path) for path in (test_case.input_file_path, test_case.output_file_path) if path is not None):
+                print((clr.RED + 'missing test case: ' + test_case.name + clr.RESET))
+                continue
+            if self.options.verify_testcases and not self.verify_test_case(test_case, case):
+                print((clr.RED + 'broken test case: ' + test_case.name + clr.RESET))
+                continue
+            test_cases.append(test_case)
+        return test_cases
+
+    def get_listed_paths(self, cases):
+        directory = self.options.testcase_directory
+        return set(os.path.normpath(os.path.join(directory, case['input'])) for case in cases)
+
+    # finds the cases that were added by hand after the manifest was written
+    def find_unlisted_test_cases(self, cases, listing):
+        listed = self.get_listed_paths(cases)
+        test_cases = []
+        index = 0
+        while True:
+            input_file_path = self.get_input_file_path(index)
+            if os.path.normpath(input_file_path) not in listed:
+                if listing.exists(input_file_path):
+                    output_file_path = self.get_output_file_path(index)
+                    if not listing.exists(output_file_path):
+                        output_file_path = None
+                    test_cases.append(TestCase(input_file_path.rsplit('.in.txt', 1)[0], input_file_path, output_file_path))
+                elif index >= len(listed):
+                    # the numbering of the listed cases may have gaps
+                    break
+            index += 1
+        return test_cases
+
+    def verify_test_case(self, test_case, case):
+        for key, path in (('input', test_case.input_file_path), ('output', test_case.output_file_path)):
+            if path is None:
+                continue
+            if not os.path.exists(path) or hash_file(path) != (case[key + '_size'], case[key + '_sha256']):
+                return False
+        return True
+
+    def download_test_cases(self):
+        result = self.download()
+        self.write_manifest(self.probe_test_cases(require_output=False))
+        if self.options.testcase_store:
+            self.store_test_cases()
+        return result
+
+    # moves the downloaded files into the compressed store
+    def store_test_cases(self):
+        test_cases = self.get_local_test_cases(require_output=False)
+        if not test_cases:
+            return
+        self.get_testcase_store().save(self.get_problem_key(), test_cases)
+        for test_case in test_cases:
+            for path in (test_case.input_file_path, test_case.output_file_path):
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+        if os.path.exists(self.get_manifest_path()):
+            os.remove(self.get_manifest_path())
+
+    def get_jobs(self):
+        return max(1, self.options.jobs)
+
+    def get_time_limit(self):
+        return self.options.time_limit
+
+    def get_memory_limit(self):
+        if self.options.memory_limit is None:
+            return None
+        return self.options.memory_limit * 1024 * 1024
+
+    def get_output_limit(self):
+        if self.options.output_limit is None:
+            return None
+        return int(self.options.output_limit * 1024 * 1024)
+
+    def format_memory(self, memory):
+        if memory is None:
+            return '- MB'
+        return '%.1f MB' % (memory / 1024.0 / 1024.0)
+
+    def format_execution_result(self, verdict, result):
+        return '%s (%f sec, cpu %f sec, %s)' % (verdict, result.wall_time, result.cpu_time, self.format_memory(result.memory))
+
+    def print_summary(self, verdicts, results):
+        max_time = max([result.wall_time for result in results] or [0.0])
+        max_cpu_time = max([result.cpu_time for result in results] or [0.0])
+        memories = [result.memory for result in results if result.memory is not None]
+        max_memory = max(memories) if memories else None
+        total = len(verdicts)
+        if total == 0:
+            print((clr.GREEN + 'No input files...' + clr.RESET))
+        elif verdicts.count('OK') == total:
+            print((clr.BLUE + 'OK ({} cases) (max {} sec, cpu {} sec, {})'.format(total, max_time, max_cpu_time, self.format_memory(max_memory)) + clr.RESET))
+        else:
+            print((clr.RED + '{} (max {} sec, cpu {} sec, {})'.format(self.format_summary(verdicts), max_time, max_cpu_time, self.format_memory(max_memory)) + clr.RESET))
+
+    def format_summary(self, verdicts):
+        names = {'WA': 'WrongAnswer', 'TLE': 'TimeLimitExceeded', 'WLE': 'WallTimeLimitExceeded', 'MLE': 'MemoryLimitExceeded', 'OLE': 'OutputLimitExceeded', 'RE': 'RuntimeError'}
+        counts = [(verdict, verdicts.count(verdict)) for verdict in names if verdict in verdicts]
+        if len(counts) == 1:
+            title = names[counts[0][0]]
+        else:
+            title = 'Failed'
+        return '{} ({} in {} cases)'.format(title, ', '.join('{} {}s'.format(count, verdict) for verdict, count in counts), len(verdicts))
 
     def check(self):
         print('compiling...')
 
         solution = self.get_solution()
+        if self.options.interactive:
+            judge = self.get_solution(self.options.interactive)
+            try:
+                for s in (solution, judge):
+                    if not s.compile():
+                        print('CompileError: ' + s.source_file_name)
+                        exit(-1)
+                self.check_interactive_solution(solution, judge)
+            finally:
+                solution.cleanup()
+                judge.cleanup()
+            return
+
+        validator = self.get_validator()
+        try:
+            if not solution.compile():
+                print('CompileError')
+                exit(-1)
+            if not validator.prepare():
+                print('CompileError: ' + self.options.checker)
+                exit(-1)
+            self.check_solution(solution, validator)
+        finally:
+            solution.cleanup()
+            validator.cleanup()
+
+    def check_solution(self, solution, validator):
+        test_cases = self.get_test_cases_or_download()
+
+        verdicts = []
+        results = []
+        jobs = self.get_jobs()
+        time_limit = self.get_time_limit()
+        memory_limit = self.get_memory_limit()
+        output_limit = self.get_output_limit()
+        work_directory = create_work_directory()
+
+        # the validation runs in the workers too. its messages are printed in the order of the cases.
+        def execute(index, test_case):
+            execution_output_file_path = os.path.join(work_directory, '%d.out.txt' % index)
+            expected_file_path = None
+            if validator.exact and test_case.has_output():
+                expected_file_path = test_case.get_output()
+            result = solution.execute(test_case.get_input(), execution_output_file_path, time_limit, memory_limit,
+                                      expected_file_path=expected_file_path, output_limit=output_limit)
+            accepted = None
+            report = io.StringIO()
+            if result.matched:
+                accepted = True
+            elif result.status in ('OK', 'WA') and test_case.has_output():
+                # also reports where the output of an aborted run went wrong
+                accepted = validator.validate(test_case.get_output(), execution_output_file_path, test_case.get_input(), report)
+            return execution_output_file_path, result, accepted, report.getvalue()
+
+        try:
+            with SolutionExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(execute, index, test_case) for index, test_case in enumerate(test_cases)]
+                for test_case, future in zip(test_cases, futures):
+                    print((clr.GREEN + '----- Case {} -----'.format(test_case.name) + clr.RESET))
+
+                    execution_output_file_path, result, accepted, report = future.result()
+                    sys.stdout.write(report)
+
+                    results.append(result)
+                    if result.status == 'TLE':
+                        print((clr.RED + self.format_execution_result('TLE', result) + clr.RESET))
+                        verdicts.append('TLE')
+                    elif result.status == 'WLE':
+                        print((clr.RED + self.format_execution_result('killed: wall limit', result) + clr.RESET))
+                        verdicts.append('WLE')
+                    elif result.status == 'MLE':
+                        print((clr.RED + self.format_execution_result('MLE', result) + clr.RESET))
+                        verdicts.append('MLE')
+                    elif result.status == 'OLE':
+                        print((clr.RED + self.format_execution_result('OLE', result) + clr.RESET))
+                        verdicts.append('OLE')
+                    elif result.status == 'RE':
+                        print((clr.RED + self.format_execution_result('RE (exit code %d)' % result.returncode, result) + clr.RESET))
+                        verdicts.append('RE')
+                    elif accepted is not None:
+                        if accepted:
+                            print((clr.BLUE + self.format_execution_result('ok', result) + clr.RESET))
+                            verdicts.append('OK')
+                        else:
+                            print((clr.RED + self.format_execution_result('WA', result) + clr.RESET))
+                            verdicts.append('WA')
+                    else:
+                        sys.stdout.write(open(execution_output_file_path).read())
+                        print((clr.GREEN + self.format_execution_result('executed', result) + clr.RESET))
+                        verdicts.append('OK')
+                    os.remove(execution_output_file_path)
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+        self.print_summary(verdicts, results)
+
+    def check_interactive_solution(self, solution, judge):
+        # the test cases of interactive problems may have no output files.
+        test_cases = self.get_test_cases_or_download(require_output=False)
+
+        time_limit = self.get_time_limit()
+        memory_limit = self.get_memory_limit()
+        work_directory = create_work_directory()
+        verdicts = []
+        results = []
+
+        # the judge is called as JUDGE input output. it exits with 0 if the solution is correct.
+        def interact(index, test_case):
+            error_file_path = os.path.join(work_directory, '%d.judge.txt' % index)
+            transcript_file_path = test_case.name + '.transcript.txt'
+            # the judge reads files, so stored data is written out first
+            input_file_path = materialize(test_case.get_input(), os.path.join(work_directory, '%d.in.txt' % index))
+            if test_case.has_output():
+                output_file_path = materialize(test_case.get_output(), os.path.join(work_directory, '%d.ans.txt' % index))
+            else:
+                output_file_path = self.get_output_file_path(index)
+            result = run_interactive(solution, judge, [input_file_path, output_file_path],
+                                     transcript_file_path, time_limit, memory_limit, error_file_path)
+            message = open(error_file_path, errors='replace').read().strip()
+            return result, message
+
+        try:
+            with SolutionExecutor(max_workers=self.get_jobs()) as executor:
+                futures = [executor.submit(interact, index, test_case) for index, test_case in enumerate(test_cases)]
+                for test_case, future in zip(test_cases, futures):
+                    print((clr.GREEN + '----- Case {} -----'.format(test_case.name) + clr.RESET))
+                    interaction, message = future.result()
+                    result = interaction.solution_result
+                    results.append(result)
+
+                    if message:
+                        print('judge: ' + message)
+                    if interaction.latencies:
+                        print('%d round trips, %f sec per round trip (max %f sec)' % (interaction.round_trips, statistics.mean(interaction.latencies), max(interaction.latencies)))
+                    else:
+                        print('0 round trips')
+                    if result.status != 'OK':
+                        verdict = result.status
+                    elif interaction.judge_result.status == 'TLE':
+                        print('the judge did not finish')
+                        verdict = 'WA'
+                    elif interaction.judge_result.returncode != 0:
+                        verdict = 'WA'
+                    else:
+                        verdict = 'OK'
+                    color = clr.BLUE if verdict == 'OK' else clr.RED
+                    print((color + self.format_execution_result('ok' if verdict == 'OK' else verdict, result) + clr.RESET))
+                    verdicts.append(verdict)
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+        self.print_summary(verdicts, results)
+
+    def bench(self):
+        print('compiling...')
+
+        solution = self.get_solution()
+        try:
+            if not solution.compile():
+                print('CompileError')
+                exit(-1)
+            self.bench_solution(solution)
+        finally:
+            solution.cleanup()
+
+    def bench_solution(self, solution):
+        test_cases = self.get_test_cases_or_download()
+
+        if not test_cases:
+            print((clr.GREEN + 'No input files...' + clr.RESET))
+            return
 
-        if not solution.compile():
-            print('CompileError')
+        runs = self.options.bench
+        time_limit = self.get_time_limit()
+        memory_limit = self.get_memory_limit()
+        work_directory = create_work_directory()
+        output_file_path = os.path.join(work_directory, 'out.txt')
+
+        try:
+            # the cases are run one by one to keep the measurements quiet.
+            # every pass runs the whole suite so that slow drifts of the machine are spread over all cases.
+            results = [[] for test_case in test_cases]
+            for iteration in range(self.options.warmup + runs):
+                measured = iteration >= self.options.warmup
+                if measured:
+                    print('run %d/%d' % (iteration - self.options.warmup + 1, runs))
+                else:
+                    print('warmup %d/%d' % (iteration + 1, self.options.warmup))
+                for index, test_case in enumerate(test_cases):
+                    result = solution.execute(test_case.get_input(), output_file_path, time_limit, memory_limit)
+                    if measured:
+                        results[index].append(result)
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+        report = {'runs': runs, 'warmup': self.options.warmup, 'cases': []}
+        print(('%-40s %-9s %-9s %-9s %-9s %-9s %-9s %s' % ('case (cpu sec)', 'min', 'median', 'mean', 'p95', 'stddev', 'wall', 'memory')))
+        for test_case, case_results in zip(test_cases, results):
+            cpu = summarize([result.cpu_time for result in case_results])
+            wall = summarize([result.wall_time for result in case_results])
+            memories = [result.memory for result in case_results if result.memory is not None]
+            memory = max(memories) if memories else None
+            statuses = sorted(set(result.status for result in case_results if result.status != 'OK'))
+            color = clr.RED if statuses else clr.BLUE
+            print((color + '%-40s %-9.6f %-9.6f %-9.6f %-9.6f %-9.6f %-9.6f %s %s' % (test_case.name, cpu['min'], cpu['median'], cpu['mean'], cpu['p95'], cpu['stddev'], wall['median'], self.format_memory(memory), ' '.join(statuses)) + clr.RESET))
+            report['cases'].append({'name': test_case.name, 'cpu_time': cpu, 'wall_time': wall, 'memory': memory, 'statuses': [result.status for result in case_results]})
+
+        suite_cpu = summarize([sum(case_results[iteration].cpu_time for case_results in results) for iteration in range(runs)])
+        suite_wall = summarize([sum(case_results[iteration].wall_time for case_results in results) for iteration in range(runs)])
+        print((clr.GREEN + '%-40s %-9.6f %-9.6f %-9.6f %-9.6f %-9.6f %-9.6f' % ('total', suite_cpu['min'], suite_cpu['median'], suite_cpu['mean'], suite_cpu['p95'], suite_cpu['stddev'], suite_wall['median']) + clr.RESET))
+        report['suite'] = {'cpu_time': suite_cpu, 'wall_time': suite_wall}
+
+        if self.options.bench_json:
+            with open(self.options.bench_json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def add_test_case(self, input_file_path, output_file_path):
+        if self.options.testcase_store:
+            test_cases = self.get_test_cases(require_output=False)
+            name = self.get_input_file_path(len(test_cases)).rsplit('.in.txt', 1)[0]
+            self.get_testcase_store().save(self.get_problem_key(), test_cases + [TestCase(name, input_file_path, output_file_path)])
+            return len(test_cases)
+        listing = DirectoryListing()
+        cases = self.read_manifest_cases()
+        listed = self.get_listed_paths(cases) if cases is not None else set()
+        index = 0
+        # the numbering may have gaps. the index of a listed case whose files were removed is not reused.
+        while listing.exists(self.get_input_file_path(index)) or os.path.normpath(self.get_input_file_path(index)) in listed:
+            index += 1
+        shutil.copyfile(input_file_path, self.get_input_file_path(index))
+        shutil.copyfile(output_file_path, self.get_output_file_path(index))
+        if cases is not None:
+            # the new case and the cases added by hand are appended. the listed files are not hashed again.
+            unlisted_test_cases = self.find_unlisted_test_cases(cases, DirectoryListing())
+            self.save_manifest(cases + [self.get_manifest_entry(test_case) for test_case in unlisted_test_cases])
+        return index
+
+    def stress(self):
+        if not self.options.generator or not self.options.reference:
+            print('--stress needs --generator and --reference')
             exit(-1)
 
-        if not os.path.exists(self.get_input_file_path(0)) or not os.path.exists(self.get_output_file_path(0)):
-            print('downloading...')
-            self.download()
+        print('compiling...')
 
-        max_time = 0.0
+        solution = self.get_solution()
+        generator = self.get_solution(self.options.generator)
+        reference = self.get_solution(self.options.reference)
+        validator = self.get_validator(verbose=False)
+        try:
+            for s in (solution, generator, reference):
+                if not s.compile():
+                    print('CompileError: ' + s.source_file_name)
+                    exit(-1)
+            if not validator.prepare():
+                print('CompileError: ' + self.options.checker)
+                exit(-1)
+            self.stress_solution(solution, generator, reference, validator)
+        finally:
+            for s in (solution, generator, reference):
+                s.cleanup()
+            validator.cleanup()
+
+    def stress_solution(self, solution, generator, reference, validator):
+        count = self.options.stress
+        jobs = self.get_jobs()
+        time_limit = self.get_time_limit()
+        memory_limit = self.get_memory_limit()
+        work_directory = create_work_directory()
+        if self.options.seed is None:
+            first_seed = random.randrange(2 ** 31)
+        else:
+            first_seed = self.options.seed
+        print('seeds %d - %d' % (first_seed, first_seed + count - 1))
+
+        # returns (seed, verdict, message, error_file_path). the files of passed cases are removed at once.
+        # the programs write their stderr to files, and only the stderr of the reported failure is shown.
+        def run(seed):
+            input_file_path = os.path.join(work_directory, '%d.in.txt' % seed)
+            answer_file_path = os.path.join(work_directory, '%d.ans.txt' % seed)
+            output_file_path = os.path.join(work_directory, '%d.out.txt' % seed)
+            error_file_path = os.path.join(work_directory, '%d.err.txt' % seed)
+            result = generator.execute(os.devnull, input_file_path, arguments=[str(seed)], error_file_path=error_file_path)
+            if result.status != 'OK':
+                return seed, 'ERROR', 'the generator failed (%s)' % result.status, error_file_path
+            result = reference.execute(input_file_path, answer_file_path, error_file_path=error_file_path)
+            if result.status != 'OK':
+                return seed, 'ERROR', 'the reference solution failed (%s)' % result.status, error_file_path
+            result = solution.execute(input_file_path, output_file_path, time_limit, memory_limit, error_file_path=error_file_path)
+            if result.status != 'OK':
+                return seed, result.status, self.format_execution_result(result.status, result), error_file_path
+            if not validator.validate(answer_file_path, output_file_path, input_file_path):
+                return seed, 'WA', self.format_execution_result('WA', result), error_file_path
+            for path in (input_file_path, answer_file_path, output_file_path, error_file_path):
+                os.remove(path)
+            return seed, 'OK', None, None
+
+        start_time = time.time()
+        last_report_time = 0.0
+        done = 0
+        failures = []
+        seeds = iter(range(first_seed, first_seed + count))
+        # the input is kept when the generator or the reference solution fails
+        keep_work_directory = False
+        try:
+            with SolutionExecutor(max_workers=jobs) as executor:
+                pending = set(executor.submit(run, seed) for seed in itertools.islice(seeds, jobs * 2))
+                while pending:
+                    finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        seed, verdict, message, error_file_path = future.result()
+                        done += 1
+                        if verdict != 'OK':
+                            failures.append((seed, verdict, message, error_file_path))
+                    if not failures:
+                        pending |= set(executor.submit(run, seed) for seed in itertools.islice(seeds, len(finished)))
+                    if time.time() - last_report_time >= 1.0 or not pending:
+                        last_report_time = time.time()
+                        sys.stdout.write('\r%d cases (%.1f cases/sec)' % (done, done / max(last_report_time - start_time, 1e-9)))
+                        sys.stdout.flush()
+            print('')
+
+            if not failures:
+                print((clr.BLUE + 'OK ({} cases)'.format(done) + clr.RESET))
+                return
+
+            # the smallest seed is reported so that the result does not depend on the scheduling.
+            seed, verdict, message, error_file_path = min(failures)
+            sys.stdout.write(open(error_file_path, errors='replace').read())
+            if verdict == 'ERROR':
+                print((clr.RED + 'seed %d: %s' % (seed, message) + clr.RESET))
+                print('the input is kept in ' + work_directory)
+                keep_work_directory = True
+                exit(-1)
+            input_file_path = os.path.join(work_directory, '%d.in.txt' % seed)
+            answer_file_path = os.path.join(work_directory, '%d.ans.txt' % seed)
+            index = self.add_test_case(input_file_path, answer_file_path)
+            print((clr.RED + 'seed %d: %s' % (seed, message) + clr.RESET))
+            print('saved as ' + self.get_input_file_path(index))
+        finally:
+            if not keep_work_directory:
+                shutil.rmtree(work_directory, ignore_errors=True)
+
+    def shrink(self):
+        test_cases = self.get_test_cases()
+        if not 0 <= self.options.shrink < len(test_cases):
+            print('test case %d is not found' % self.options.shrink)
+            exit(-1)
 
-        validator = self.get_validator()
+        print('compiling...')
 
-        wa = 0
-        total = 0
-        no_input_files = True
+        solution = self.get_solution()
+        reference = None
+        if self.options.reference:
+            reference = self.get_solution(self.options.reference)
+        validator = self.get_validator(verbose=False)
+        try:
+            for s in (solution, reference):
+                if s is not None and not s.compile():
+                    print('CompileError: ' + s.source_file_name)
+                    exit(-1)
+            if not validator.prepare():
+                print('CompileError: ' + self.options.checker)
+                exit(-1)
+            self.shrink_test_case(test_cases[self.options.shrink], solution, reference, validator)
+        finally:
+            for s in (solution, reference):
+                if s is not None:
+                    s.cleanup()
+            validator.cleanup()
+
+    def shrink_test_case(self, test_case, solution, reference, validator):
+        time_limit = self.get_time_limit()
+        memory_limit = self.get_memory_limit()
+        work_directory = create_work_directory()
+        counter = itertools.count()
+
+        # returns the verdict of the solution for the input.
+        # None means the input itself is broken, i.e. the reference solution does not accept it.
+        # most candidates are broken, so the stderr of these runs is discarded.
+        def judge(text, answer_file_path=None):
+            name = os.path.join(work_directory, str(next(counter)))
+            input_file_path = name + '.in.txt'
+            output_file_path = name + '.out.txt'
+            with open(input_file_path, 'w') as f:
+                f.write(text)
+            try:
+                if answer_file_path is None and reference is not None:
+                    answer_file_path = name + '.ans.txt'
+                    if reference.execute(input_file_path, answer_file_path, error_file_path=os.devnull).status != 'OK':
+                        return None
+                result = solution.execute(input_file_path, output_file_path, time_limit, memory_limit, error_file_path=os.devnull)
+                if result.status != 'OK':
+                    return result.status
+                if answer_file_path is None:
+                    return 'OK'
+                return 'OK' if validator.validate(answer_file_path, output_file_path, input_file_path) else 'WA'
+            finally:
+                for path in (input_file_path, output_file_path, name + '.ans.txt'):
+                    if os.path.exists(path):
+                        os.remove(path)
 
-        while True:
-            input_file_path = self.get_input_file_path(total)
-            if not os.path.exists(input_file_path):
-                break
-            if not os.path.exists(self.get_output_file_path(total)):
+        try:
+            with io.TextIOWrapper(open_data(test_case.get_input())) as f:
+                text = f.read()
+            verdict = judge(text, test_case.get_output())
+            if verdict == 'OK':
+                print((clr.BLUE + 'the solution passes ' + test_case.name + clr.RESET))
+                return
+            if verdict == 'WA' and reference is None:
+                print('shrinking a WA case needs --reference')
+                exit(-1)
+            print('%s: %s, %d bytes' % (test_case.name, verdict, len(text)))
+
+            # the smaller inputs must fail in the same way as the original one.
+            def fails(units):
+                return judge(''.join(units)) == verdict
+
+            with SolutionExecutor(max_workers=self.get_jobs()) as executor:
+                units = self.delta_debug(text.splitlines(True), fails, executor, 'lines')
+                units = self.delta_debug(re.findall(r'\s*\S+|\s+$', ''.join(units)), fails, executor, 'tokens')
+            text = ''.join(units)
+
+            input_file_path = os.path.join(work_directory, 'shrunk.in.txt')
+            answer_file_path = os.path.join(work_directory, 'shrunk.ans.txt')
+            with open(input_file_path, 'w') as f:
+                f.write(text)
+            if reference is not None:
+                reference.execute(input_file_path, answer_file_path, error_file_path=os.devnull)
+            else:
+                # the expected output is unknown. the case still reproduces RE, TLE or MLE.
+                open(answer_file_path, 'w').close()
+            # the stderr of the solution is shown for the minimal case only
+            solution.execute(input_file_path, os.path.join(work_directory, 'shrunk.out.txt'), time_limit, memory_limit)
+            index = self.add_test_case(input_file_path, answer_file_path)
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)
+        print((clr.RED + '%s, %d bytes' % (verdict, len(text)) + clr.RESET))
+        print('saved as ' + self.get_input_file_path(index))
+
+    def delta_debug(self, units, fails, executor, unit_name):
+        # ddmin. the candidates of each granularity are tested in parallel.
+        n = 2
+        while len(units) >= 2:
+            chunk_size = (len(units) + n - 1) // n
+            starts = range(0, len(units), chunk_size)
+            subsets = [units[start:start + chunk_size] for start in starts]
+            complements = [units[:start] + units[start + chunk_size:] for start in starts]
+            candidates = subsets + complements if len(subsets) > 2 else subsets
+            results = list(executor.map(fails, candidates))
+            if True in results:
+                i = results.index(True)
+                units = candidates[i]
+                n = 2 if i < len(subsets) else max(n - 1, 2)
+                print('%d %s' % (len(units), unit_name))
+            elif n >= len(units):
                 break
+            else:
+                n = min(len(units), n * 2)
+        return units
 
-            case_name = input_file_path.rsplit('.in.txt', 1)[0]
-            output_file_path = case_name + '.out.txt'
+    def sweep(self):
+        if not self.options.generator:
+            print('--sweep needs --generator')
+            exit(-1)
 
-            no_input_files = False
+        print('compiling...')
+
+        solution = self.get_solution()
+        generator = self.get_solution(self.options.generator)
+        try:
+            for s in (solution, generator):
+                if not s.compile():
+                    print('CompileError: ' + s.source_file_name)
+                    exit(-1)
+            self.sweep_solution(solution, generator)
+        finally:
+            for s in (solution, generator):
+                s.cleanup()
+
+    def sweep_solution(self, solution, generator):
+        sizes = [int(float(size)) for size in self.options.sizes.split(',')]
+        max_n = int(float(self.options.max_n)) if self.options.max_n else max(sizes)
+        seed = self.options.seed if self.options.seed is not None else 0
+        # the median of a few runs is used for each size.
+        runs = 3
+        time_limit = self.get_time_limit()
+        work_directory = create_work_directory()
+        input_file_path = os.path.join(work_directory, 'in.txt')
+        output_file_path = os.path.join(work_directory, 'out.txt')
 
-            print((clr.GREEN + '----- Case {} -----'.format(case_name) + clr.RESET))
+        try:
+            # as with --stress, the generator gets the seed as the first argument. N is the second one.
+            measured_sizes = []
+            inputs = set()
+            times = []
+            memories = []
+            print(('%-12s %-12s %-12s %s' % ('N', 'cpu sec', 'wall sec', 'memory')))
+            for n in sizes:
+                result = generator.execute(os.devnull, input_file_path, arguments=[str(seed), str(n)])
+                if result.status != 'OK':
+                    print((clr.RED + 'the generator failed at N=%d (%s)' % (n, result.status) + clr.RESET))
+                    break
+                inputs.add(hash_file(input_file_path))
+                results = [solution.execute(input_file_path, output_file_path, time_limit) for run in range(runs)]
+                cpu_time = statistics.median([result.cpu_time for result in results])
+                wall_time = statistics.median([result.wall_time for result in results])
+                memory = max([result.memory for result in results if result.memory is not None] or [None])
+                statuses = sorted(set(result.status for result in results if result.status != 'OK'))
+                color = clr.RED if statuses else clr.GREEN
+                print((color + '%-12d %-12.6f %-12.6f %s %s' % (n, cpu_time, wall_time, self.format_memory(memory), ' '.join(statuses)) + clr.RESET))
+                if statuses:
+                    # TLE or RE runs say nothing about the growth.
+                    break
+                measured_sizes.append(n)
+                times.append(cpu_time)
+                memories.append(memory)
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+        if len(measured_sizes) < 3:
+            print('at least 3 sizes are needed to estimate the complexity')
+            return
+        if len(inputs) == 1:
+            # a generator written for --stress ignores N
+            print((clr.RED + 'the input is the same for every N. the generator gets N as the second argument' + clr.RESET))
+            return
+
+        fits = fit_complexity(measured_sizes, times)
+        print('time:   ' + ', '.join('%s %.3f' % (name, score) for score, name, predict in fits))
+        score, name, predict = fits[0]
+        estimated_time = predict(max_n)
+        color = clr.RED if time_limit is not None and estimated_time > time_limit else clr.BLUE
+        print((color + 'time looks like %s. estimated %f sec at N=%d' % (name, estimated_time, max_n) + clr.RESET))
+        if None not in memories:
+            score, name, predict = fit_complexity(measured_sizes, memories)[0]
+            print((clr.BLUE + 'memory looks like %s. estimated %s at N=%d' % (name, self.format_memory(predict(max_n)), max_n) + clr.RESET))
+
+    def compare(self):
+        # each variant is SOURCE or SOURCE:RUNTIME, e.g. a.py:py3 a.py:pypy3
+        variants = []
+        for variant in self.options.compare:
+            if ':' in variant:
+                source_file_name, runtime = variant.rsplit(':', 1)
+                variants.append((variant, self.get_solution(source_file_name, [runtime])))
+            else:
+                variants.append((variant, self.get_solution(variant)))
+        if len(variants) < 2:
+            print('--compare needs two or more variants')
+            exit(-1)
 
-            execution_time = solution.execute(input_file_path, 'out.txt')
+        print('compiling...')
+        validator = self.get_validator(verbose=False)
+        try:
+            for name, solution in variants:
+                if not solution.compile():
+                    print('CompileError: ' + name)
+                    exit(-1)
+            if not validator.prepare():
+                print('CompileError: ' + self.options.checker)
+                exit(-1)
+            self.compare_solutions(variants, validator)
+        finally:
+            for name, solution in variants:
+                solution.cleanup()
+            validator.cleanup()
+
+    def compare_solutions(self, variants, validator):
+        test_cases = self.get_test_cases_or_download()
+
+        if not test_cases:
+            print((clr.GREEN + 'No input files...' + clr.RESET))
+            return
 
-            if max_time < execution_time:
-                max_time = execution_time
+        rounds = self.options.rounds
+        time_limit = self.get_time_limit()
+        work_directory = create_work_directory()
+        output_file_path = os.path.join(work_directory, 'out.txt')
 
-            if os.path.exists(output_file_path):
-                result = validator.validate(output_file_path, 'out.txt')
-                if result:
-                    print((clr.BLUE + ('ok (%f sec)' % execution_time) + clr.RESET))
+        try:
+            # the runs of the variants are interleaved and their order is rotated,
+            # so that a drift of the machine affects every variant in the same way.
+            times = [[[] for variant in variants] for test_case in test_cases]
+            # the verdicts other than OK. the cases with any of them are left out of the speedups.
+            failures = [[set() for variant in variants] for test_case in test_cases]
+            for iteration in range(self.options.warmup + rounds):
+                measured = iteration >= self.options.warmup
+                if measured:
+                    print('round %d/%d' % (iteration - self.options.warmup + 1, rounds))
                 else:
-                    print((clr.RED + ('WA (%f sec)' % execution_time) + clr.RESET))
-                    wa += 1
+                    print('warmup %d/%d' % (iteration + 1, self.options.warmup))
+                for case_index, test_case in enumerate(test_cases):
+                    for k in range(len(variants)):
+                        variant_index = (k + iteration + case_index) % len(variants)
+                        result = variants[variant_index][1].execute(test_case.get_input(), output_file_path, time_limit)
+                        status = result.status
+                        if status == 'OK' and test_case.has_output() and not validator.validate(test_case.get_output(), output_file_path, test_case.get_input()):
+                            status = 'WA'
+                        if status != 'OK':
+                            failures[case_index][variant_index].add(status)
+                        elif measured:
+                            times[case_index][variant_index].append(result.cpu_time)
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+        baseline_name = variants[0][0]
+        print('cpu sec (median), speedup = %s / variant, p = Mann-Whitney U test' % baseline_name)
+        print(('%-30s ' % 'case') + ' '.join('%-30s' % name for name, solution in variants))
+        speedups = [[] for variant in variants]
+        for case_index, (test_case, case_times) in enumerate(zip(test_cases, times)):
+            case_failures = failures[case_index]
+            if case_failures[0]:
+                cells = ['%-30s' % ' '.join(sorted(case_failures[0]))]
             else:
-                sys.stdout.write(open('out.txt').read())
-                print((clr.GREEN + ('executed (%f sec)' % execution_time) + clr.RESET))
-            total += 1
-
-        if no_input_files:
-            print((clr.GREEN + 'No input files...' + clr.RESET))
-        elif wa == 0:
-            print((clr.BLUE + 'OK ({} cases) (max {} sec)'.format(total, max_time) + clr.RESET))
-        else:
-            print((clr.RED + 'WrongAnswer ({} WAs in {} cases) (max {} sec)'.format(wa, total, max_time) + clr.RESET))
+                baseline = statistics.median(case_times[0])
+                cells = ['%-30s' % ('%f' % baseline)]
+            for variant_index in range(1, len(variants)):
+                if case_failures[variant_index]:
+                    cells.append('%-30s' % ' '.join(sorted(case_failures[variant_index])))
+                    continue
+                median = statistics.median(case_times[variant_index])
+                if case_failures[0]:
+                    cells.append('%-30s' % ('%f' % median))
+                    continue
+                speedup = baseline / median if median > 0.0 else float('inf')
+                speedups[variant_index].append(speedup)
+                p = mann_whitney_u(case_times[0], case_times[variant_index])
+                cells.append('%-30s' % ('%f x%.2f p=%.3f' % (median, speedup, p)))
+            line = ('%-30s ' % test_case.name) + ' '.join(cells)
+            print((clr.RED + line + clr.RESET) if any(case_failures) else line)
+
+        for variant_index in range(1, len(variants)):
+            # only the cases passed by both the baseline and the variant are compared
+            passed_cases = [case_index for case_index in range(len(test_cases)) if not failures[case_index][0] and not failures[case_index][variant_index]]
+            if not passed_cases:
+                print((clr.RED + '%s: no case passed by both %s and the variant' % (variants[variant_index][0], baseline_name) + clr.RESET))
+                continue
+            totals = [[sum(times[case_index][index][r] for case_index in passed_cases) for r in range(rounds)] for index in (0, variant_index)]
+            finite = [speedup for speedup in speedups[variant_index] if 0.0 < speedup < float('inf')]
+            geometric_mean = math.exp(statistics.mean([math.log(speedup) for speedup in finite])) if finite else float('nan')
+            p = mann_whitney_u(totals[0], totals[1])
+            color = clr.BLUE if p < 0.05 else clr.GREEN
+            over = '' if len(passed_cases) == len(test_cases) else ' over %d of %d cases' % (len(passed_cases), len(test_cases))
+            print((color + '%s: x%.3f (geometric mean over cases), total p=%.3f%s%s' % (variants[variant_index][0], geometric_mean, p, over, '' if p < 0.05 else ' (not significant)') + clr.RESET))
 
     def submit(self):
         raise NotImplementedError
 
+    # judges that report the status of submissions return ({submission id: (verdict, time, memory, finished)}, interval).
+    # time and memory are strings such as '2 ms' and '3604 KB', or None while judging.
+    # interval is the polling interval in seconds the judge asks for, or None.
+    def get_submission_statuses(self, submission_ids):
+        raise NotImplementedError
+
+    def watch_submissions(self, submission_ids):
+        # all pending submissions are polled with one request. the interval is reset when a status changes
+        # and doubles while nothing changes.
+        pending = list(submission_ids)
+        last_statuses = {}
+        interval = self.min_poll_interval
+        while pending:
+            statuses, requested_interval = self.get_submission_statuses(pending)
+            changed = False
+            for submission_id in list(pending):
+                status = statuses.get(submission_id)
+                if status == None or status == last_statuses.get(submission_id):
+                    continue
+                changed = True
+                last_statuses[submission_id] = status
+                verdict, execution_time, memory, finished = status
+                if not finished:
+                    color = clr.BLUE
+                elif verdict == 'AC':
+                    color = clr.GREEN
+                else:
+                    color = clr.RED
+                line = '%s: %s' % (submission_id, verdict)
+                if execution_time != None:
+                    line += ' %s' % execution_time
+                if memory != None:
+                    line += ' %s' % memory
+                print(color + line + clr.RESET)
+                if finished:
+                    pending.remove(submission_id)
+            if not pending:
+                break
+            if changed:
+                interval = self.min_poll_interval
+            else:
+                interval = min(interval * 2, self.max_poll_interval)
+            if requested_interval != None:
+                interval = max(interval, requested_interval)
+            time.sleep(interval)
+
     def create_solution_template_file(self):
         try:
             src = self.get_source_file_name()
@@ -236,17 +1197,8 @@ class POJ(OnlineJudge):
     def get_url(self):
         return 'http://acm.pku.edu.cn/JudgeOnline/problem?id=' + self.problem_id
 
-    def download(self):
-        html = self.download_html()
-        p = re.compile('<pre class="sio">(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2;
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def get_sample_extractor(self):
+        return SampleExtractor(pre_class='sio')
 
     def submit(self):
         opener = self.get_opener()
@@ -293,18 +1245,6 @@ class CodeForces(OnlineJudge):
     def get_url(self):
         return 'http://codeforces.com/contest/' + self.contest_id + '/problem/' + self.problem_id
 
-    def download(self):
-        html = self.download_html()
-        p = re.compile('<pre>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2;
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
-
 
 class MJudge(OnlineJudge):
     def __init__(self, options, args):
@@ -327,19 +1267,8 @@ class MJudge(OnlineJudge):
         p = opener.open(url)
         return p.read()
 
-    def download(self):
-        html = self.download_html()
-        index = html.rfind('Sample Input')
-        html = html[index:]
-        p = re.compile('<pre>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2;
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def get_sample_extractor(self):
+        return SampleExtractor(['Sample Input'], last=True)
 
     def submit(self):
         opener = self.get_opener()
@@ -371,21 +1300,8 @@ class AOJ(OnlineJudge):
     def get_url(self):
         return 'http://judge.u-aizu.ac.jp/onlinejudge/description.jsp?id=' + self.problem_id
 
-    def download(self):
-        html = self.download_html().decode('utf-8')
-        if '入力例' in html:
-            html = html[html.find('入力例'):]
-        if 'Sample Input' in html:
-            html = html[html.find('Sample Input'):]
-        p = re.compile('<pre.*?>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) // 2
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def get_sample_extractor(self):
+        return SampleExtractor(['入力例', 'Sample Input'])
 
     def submit(self):
         opener = self.get_opener()
@@ -419,31 +1335,59 @@ class AOJ(OnlineJudge):
 
 
 class AOJ_test(OnlineJudge):
+    download_workers = 8
+    retries = 3
+
     def __init__(self, options, args):
         OnlineJudge.__init__(self, options, args[0])
 
     def get_url(self,index,inout):
         return 'http://analytic.u-aizu.ac.jp:8080/aoj/testcase.jsp?id=' + self.problem_id + '&case=' + str(index) + '&type=' + inout
 
+    # returns None if the test case does not exist
     def download_html(self,index,inout):
         url = self.get_url(index,inout)
-        return self.get_opener().open(url).read()
+        for attempt in range(self.retries + 1):
+            try:
+                return self.opener.open(url).read()
+            except urllib.error.HTTPError as error:
+                # reading the body to the end lets the connection be reused
+                error.read()
+                if error.code < 500:
+                    return None
+            except (urllib.error.URLError, http.client.HTTPException, OSError):
+                pass
+            if attempt < self.retries:
+                time.sleep(0.5 * 2 ** attempt)
+        raise IOError('failed to download ' + url)
+
+    def download_test_case(self, index):
+        input_data = self.download_html(index + 1, "in")
+        if input_data is None or input_data == b"In preparation.\n":
+            return input_data, None
+        return input_data, self.download_html(index + 1, "out")
 
     def download(self):
-        for index in range(100):
-            try:
-                input_data=self.download_html(index+1,"in")
-                if input_data == "In preparation.\n":
-                    print("testcase in preparation")
-                    break
-                output_data=self.download_html(index+1,"out")
-                input_file_name = self.get_input_file_path(index)
-                output_file_name = self.get_output_file_path(index)
-                open(input_file_name, 'w').write(input_data)
-                open(output_file_name, 'w').write(output_data)
-            except:
-                print(("testcase notfound: index%d"%index))
-                break
+        # the opener is built once, so that every worker shares its connection pool
+        self.get_opener()
+        # the cases are fetched in batches so that not too many requests go beyond the last case
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.download_workers) as executor:
+            for first in range(0, 100, self.download_workers):
+                indices = range(first, min(first + self.download_workers, 100))
+                try:
+                    results = list(executor.map(self.download_test_case, indices))
+                except IOError as error:
+                    print(error)
+                    return False
+                for index, (input_data, output_data) in zip(indices, results):
+                    if input_data == b"In preparation.\n":
+                        print("testcase in preparation")
+                        return True
+                    if input_data is None or output_data is None:
+                        print(("testcase notfound: index%d"%index))
+                        return True
+                    write_file_atomically(self.get_input_file_path(index), input_data)
+                    write_file_atomically(self.get_output_file_path(index), output_data)
         return True
 
 
@@ -463,10 +1407,11 @@ class CodeChef(OnlineJudge):
         return 'http://www.codechef.com/' + self.contest_id + '/problems/' + self.problem_id
 
     def download(self):
-        html = self.download_html()
+        page = self.download_html().decode('utf-8', 'replace')
         p = re.compile('put:</b>(.+?)<', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2;
+        # the samples are not in <pre>, so the extractor is not used
+        result = [html.unescape(text) for text in p.findall(page)]
+        n = len(result) // 2
         for index in range(n):
             input_file_name = self.get_input_file_path(index)
             output_file_name = self.get_output_file_path(index)
@@ -490,26 +1435,17 @@ class ImoJudge(OnlineJudge):
     def get_url(self):
         return 'http://judge.imoz.jp/page.php?page=view_problem&pid=%s&cid=%s' % (self.problem_id, self.contest_id)
 
-    def download(self):
-        html = self.download_html()
-        p = re.compile('<pre>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2;
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
-
 
 class AtCoder(OnlineJudge):
     contest_id = None
+    prefetch_workers = 4
     def __init__(self, options, args):
-        OnlineJudge.__init__(self, options, args[1])
+        # the problem id is omitted for --prefetch-contest
+        OnlineJudge.__init__(self, options, args[1] if len(args) > 1 else None)
         self.contest_id = args[0]
 
-        self.problem_id = self.assume_correct_probrem_id()
+        if self.problem_id != None:
+            self.problem_id = self.assume_correct_probrem_id()
 
     def assume_correct_probrem_id(self):
         result = re.match(r'(a[rb]c)(\d{3})', self.contest_id)
@@ -534,13 +1470,14 @@ class AtCoder(OnlineJudge):
     def get_url(self):
         return "https://atcoder.jp/contests/%s/tasks/%s" % (self.contest_id, self.problem_id)
 
-    def get_opener(self):
-        if self.opener:
-            return self.opener
+    def get_login_url(self):
+        return 'https://atcoder.jp/login'
 
-        opener = OnlineJudge.get_opener(self)
+    def get_session_cookie_name(self):
+        return 'REVEL_SESSION'
 
-        html = opener.open('https://atcoder.jp/login').read().decode('utf-8')
+    def login(self):
+        html = self.opener.open(self.get_login_url()).read().decode('utf-8')
         # print(html)
         pattern = re.compile('<input type="hidden" name="csrf_token" value="(.+)" />')
         result = pattern.findall(html)
@@ -553,25 +1490,46 @@ class AtCoder(OnlineJudge):
         postdata['csrf_token'] = csrf_token
         # print(postdata)
         params = urllib.parse.urlencode(postdata).encode('utf-8')
-        p = opener.open('https://atcoder.jp/login', params)
+        p = self.opener.open(self.get_login_url(), params)
         print('Login ... ' + str(p.getcode()))
-        return self.opener
+        return self.login_succeeded(p)
+
+    def get_sample_extractor(self):
+        return SampleExtractor(['入力例', 'Sample Input'])
+
+    def get_task_ids(self):
+        html = self.download_html('https://atcoder.jp/contests/%s/tasks' % self.contest_id).decode('utf-8')
+        pattern = re.compile('href="/contests/%s/tasks/([^"/?#]+)"' % re.escape(self.contest_id))
+        task_ids = []
+        for task_id in pattern.findall(html):
+            if task_id not in task_ids:
+                task_ids.append(task_id)
+        return task_ids
+
+    def prefetch_contest(self):
+        # logs in once, and every task shares the session
+        self.get_opener()
+        task_ids = self.get_task_ids()
+        if not task_ids:
+            print('no tasks found: ' + self.contest_id)
+            return False
 
-    def download(self):
-        html = self.download_html().decode('utf-8')
-        if '入力例' in html:
-            html = html[html.find('入力例'):]
-        if 'Sample Input' in html:
-            html = html[html.find('Sample Input'):]
-        p = re.compile('<pre.*?>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) // 2
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+        def download_task(task_id):
+            judge = copy.copy(self)
+            judge.problem_id = task_id
+            return judge.download_test_cases()
+
+        succeeded = True
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.prefetch_workers) as executor:
+            futures = [executor.submit(download_task, task_id) for task_id in task_ids]
+            for task_id, future in zip(task_ids, futures):
+                try:
+                    future.result()
+                    print('downloaded ' + task_id)
+                except (urllib.error.URLError, http.client.HTTPException, OSError) as error:
+                    print('failed to download %s: %s' % (task_id, error))
+                    succeeded = False
+        return succeeded
 
     def submit(self):
         html = self.download_html().decode('utf-8')
@@ -585,12 +1543,43 @@ class AtCoder(OnlineJudge):
         postdata['sourceCode'] = open(self.get_source_file_name()).read()
         postdata['csrf_token'] = csrf_token
         params = urllib.parse.urlencode(postdata).encode('utf-8')
-        p = self.get_opener().open('https://atcoder.jp/contests/%s/submit' % self.contest_id, params)
+        p = self.open_with_session('https://atcoder.jp/contests/%s/submit' % self.contest_id, params)
         print(('Submit ... ' + str(p.getcode())))
 
-        time.sleep(3.0)
-        setting = json.load(open(self.options.setting_file_path))['atcoder']
-        subprocess.call([setting['browser'], 'https://atcoder.jp/contests/%s/submissions/me' % self.contest_id])
+        # an accepted submission is redirected to the own submissions, newest first
+        html = p.read().decode('utf-8')
+        result = re.search(r'/contests/%s/submissions/(\d+)' % re.escape(self.contest_id), html)
+        if not p.geturl().endswith('/submissions/me') or not result:
+            print('the submission was not found')
+            setting = json.load(open(self.options.setting_file_path))['atcoder']
+            subprocess.call([setting['browser'], 'https://atcoder.jp/contests/%s/submissions/me' % self.contest_id])
+            return None
+        submission_id = result.group(1)
+        print('Submission ID ... ' + submission_id)
+        if not self.options.no_wait:
+            self.watch_submissions([submission_id])
+        return submission_id
+
+    def get_submission_statuses(self, submission_ids):
+        # the endpoint the submissions page refreshes the judging rows with
+        query = urllib.parse.urlencode([('sids[]', submission_id) for submission_id in submission_ids])
+        url = 'https://atcoder.jp/contests/%s/submissions/me/status/json?%s' % (self.contest_id, query)
+        data = json.loads(self.open_with_session(url).read().decode('utf-8'))
+        statuses = {}
+        for submission_id, result in data.get('Result', {}).items():
+            cells = result['Html']
+            verdict = re.search(r'<span[^>]*>(.*?)</span>', cells, re.S)
+            verdict = html.unescape(verdict.group(1)).strip() if verdict else '?'
+            execution_time = re.search(r'>\s*(\d+ ms)\s*<', cells)
+            memory = re.search(r'>\s*(\d+ KB)\s*<', cells)
+            # WJ, WR (waiting for rejudge) and progress such as 3/10 WJ are not final
+            finished = verdict.split()[-1] not in ('WJ', 'WR', 'Judging') and '/' not in verdict
+            statuses[submission_id] = (verdict,
+                                       execution_time.group(1) if execution_time else None,
+                                       memory.group(1) if memory else None,
+                                       finished)
+        interval = data.get('Interval')
+        return statuses, interval / 1000.0 if interval else None
 
     def get_language_id_from_extension(self):
         return {'.cpp':'4003',
@@ -611,45 +1600,32 @@ class ZOJContest(OnlineJudge):
     def get_url(self):
         return 'http://acm.zju.edu.cn/onlinejudge/showContestProblem.do?problemId=%s' % self.problem_id
 
-    def get_opener(self):
-        if self.opener == None:
-            opener = OnlineJudge.get_opener(self)
-
-            setting = json.load(open(self.options.setting_file_path))['zoj']
-            postdata = dict()
-            postdata['handle'] = setting['user_id']
-            postdata['password'] = setting['password']
-            postdata['rememberMe'] = '1'
-            postdata['submit'] = 'Login'
-            params = urllib.parse.urlencode(postdata)
-            p = opener.open('http://acm.zju.edu.cn/onlinejudge/login.do', params)
-            print(('Login ... ' + str(p.getcode())))
-        return self.opener
+    def get_login_url(self):
+        return 'http://acm.zju.edu.cn/onlinejudge/login.do'
 
-    def download(self):
-        opener = self.get_opener()
+    def get_session_cookie_name(self):
+        return 'JSESSIONID'
 
-        html = self.download_html()
-        p = re.compile('<pre>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2;
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def login(self):
+        setting = json.load(open(self.options.setting_file_path))['zoj']
+        postdata = dict()
+        postdata['handle'] = setting['user_id']
+        postdata['password'] = setting['password']
+        postdata['rememberMe'] = '1'
+        postdata['submit'] = 'Login'
+        params = urllib.parse.urlencode(postdata).encode('utf-8')
+        p = self.opener.open(self.get_login_url(), params)
+        print(('Login ... ' + str(p.getcode())))
+        return self.login_succeeded(p)
 
     def submit(self):
-        opener = self.get_opener()
-
         postdata = dict()
         postdata['problemId'] = self.problem_id
         postdata['languageId'] = '2'
         postdata['source'] = open(self.get_source_file_name()).read()
         postdata['submit'] = 'Submit'
         params = urllib.parse.urlencode(postdata)
-        p = opener.open('http://acm.zju.edu.cn/onlinejudge/contestSubmit.do')
+        p = self.open_with_session('http://acm.zju.edu.cn/onlinejudge/contestSubmit.do')
         print(('Submit ... ' + str(p.getcode())))
 
     def get_language_id_from_extension(self):
@@ -669,46 +1645,33 @@ class NPCA(OnlineJudge):
     def get_url(self):
         return 'http://judge.npca.jp/problems/view/%s' % self.problem_id
 
-    def get_opener(self):
-        if self.opener == None:
-            opener = OnlineJudge.get_opener(self)
-
-            setting = json.load(open(self.options.setting_file_path))['npca']
-            postdata = dict()
-            postdata['_method'] = 'POST'
-            postdata['data[User][username]'] = setting['user_id']
-            postdata['data[User][password]'] = setting['password']
-            postdata['data[User][active]'] = '1'
-            postdata['submit'] = 'Login'
-            params = urllib.parse.urlencode(postdata)
-            p = opener.open('http://judge.npca.jp/users/login', params)
-            print(('Login ... ' + str(p.getcode())))
-        return self.opener
+    def get_login_url(self):
+        return 'http://judge.npca.jp/users/login'
 
-    def download(self):
-        opener = self.get_opener()
+    def get_session_cookie_name(self):
+        return 'CAKEPHP'
 
-        html = self.download_html()
-        p = re.compile('<pre>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2;
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def login(self):
+        setting = json.load(open(self.options.setting_file_path))['npca']
+        postdata = dict()
+        postdata['_method'] = 'POST'
+        postdata['data[User][username]'] = setting['user_id']
+        postdata['data[User][password]'] = setting['password']
+        postdata['data[User][active]'] = '1'
+        postdata['submit'] = 'Login'
+        params = urllib.parse.urlencode(postdata).encode('utf-8')
+        p = self.opener.open(self.get_login_url(), params)
+        print(('Login ... ' + str(p.getcode())))
+        return self.login_succeeded(p)
 
     def submit(self):
-        opener = self.get_opener()
-
         postdata = dict()
         postdata['_method'] = 'POST'
         postdata['data[Submission][language_id]'] = self.get_language_id()
         postdata['data[Submission][source]'] = open(self.get_source_file_name()).read()
         postdata['submit'] = 'Submit'
         params = urllib.parse.urlencode(postdata)
-        p = opener.open('http://judge.npca.jp/submissions/submit/%s/' % self.problem_id)
+        p = self.open_with_session('http://judge.npca.jp/submissions/submit/%s/' % self.problem_id)
         print(('Submit ... ' + str(p.getcode())))
 
     def get_language_id_from_extension(self):
@@ -730,43 +1693,30 @@ class KCS(OnlineJudge):
     def get_url(self):
         return "http://kcs.miz-miz.biz/contest/%s/view/%s" % (self.contest_id, self.problem_id)
 
-    def get_opener(self):
-        if self.opener == None:
-            opener = OnlineJudge.get_opener(self)
-
-            setting = json.load(open(self.options.setting_file_path))['kcs']
-            postdata = dict()
-            postdata['user_id'] = setting['user_id']
-            postdata['password'] = setting['password']
-            postdata['submit'] = '送信'
-            params = urllib.parse.urlencode(postdata)
-            p = opener.open('http://kcs.miz-miz.biz/user/login', params)
-            print(('Login ... ' + str(p.getcode())))
-        return self.opener
+    def get_login_url(self):
+        return 'http://kcs.miz-miz.biz/user/login'
 
-    def download(self):
-        html = self.download_html()
-        if '入出力例' in html:
-            html = html[html.find('入出力例'):]
-        p = re.compile('<pre>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def login(self):
+        setting = json.load(open(self.options.setting_file_path))['kcs']
+        postdata = dict()
+        postdata['user_id'] = setting['user_id']
+        postdata['password'] = setting['password']
+        postdata['submit'] = '送信'
+        params = urllib.parse.urlencode(postdata).encode('utf-8')
+        p = self.opener.open(self.get_login_url(), params)
+        print(('Login ... ' + str(p.getcode())))
+        return self.login_succeeded(p)
 
-    def submit(self):
-        opener = self.get_opener()
+    def get_sample_extractor(self):
+        return SampleExtractor(['入出力例'])
 
+    def submit(self):
         postdata = dict()
         postdata['language'] = self.get_language_id()
         postdata['code'] = open(self.get_source_file_name()).read()
         postdata['submit'] = 'submit'
         params = urllib.parse.urlencode(postdata)
-        p = opener.open('http://kcs.miz-miz.biz/contest/%s/submit/%s' % (self.contest_id, self.problem_id), params)
+        p = self.open_with_session('http://kcs.miz-miz.biz/contest/%s/submit/%s' % (self.contest_id, self.problem_id), params)
         print(('Submit ... ' + str(p.getcode())))
 
         time.sleep(2.0)
@@ -790,19 +1740,8 @@ class yukicoder(OnlineJudge):
     def get_url(self):
         return "http://yukicoder.me/problems/no/%s" % self.problem_id
 
-    def download(self):
-        html = self.download_html()
-        if 'class="sample"' in html:
-            html = html[html.find('class="sample"'):]
-        p = re.compile('<pre>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) / 2
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def get_sample_extractor(self):
+        return SampleExtractor(['.sample'])
 
     def get_source_file_name(self):
         if self.options.source_file_name:
@@ -811,41 +1750,79 @@ class yukicoder(OnlineJudge):
             return '../yukicoder' + self.problem_id + '.rb'
 
 class yukicoder_test(OnlineJudge):
+    extract_workers = 4
     def __init__(self, options, args):
         OnlineJudge.__init__(self, options, args[0])
-        self.testcase_names=[""]
-        testfoldername = self.__class__.__name__ + '.' + self.problem_id + "/test_in"
-        if os.path.exists(testfoldername):
-            self.testcase_names = os.listdir(testfoldername)
+        self.testcase_names = None
+
+    def get_testcase_directory(self):
+        return os.path.join(self.options.testcase_directory, self.__class__.__name__ + '.' + self.problem_id)
+
+    def get_testcase_names(self):
+        if self.testcase_names == None:
+            # archives extracted before manifests were written are listed from the directory
+            testfoldername = os.path.join(self.get_testcase_directory(), "test_in")
+            names = sorted(os.listdir(testfoldername)) if os.path.exists(testfoldername) else []
+            cases = self.read_manifest_cases()
+            if cases != None:
+                listed_names = [os.path.basename(case['input']) for case in cases]
+                # cases added by hand come after the listed ones
+                names = listed_names + [name for name in names if name not in listed_names]
+            self.testcase_names = names
+        return self.testcase_names
 
     def get_input_file_name(self, index):
-        if len(self.testcase_names) <= index:
+        if len(self.get_testcase_names()) <= index:
             return "----invalid name" # とりあえずなさそうな名前を返す
-        print((self.testcase_names[index]))
         return self.__class__.__name__ + '.' + self.problem_id + '/test_in/' + self.testcase_names[index]
 
     def get_output_file_name(self, index):
-        if len(self.testcase_names) <= index:
+        if len(self.get_testcase_names()) <= index:
             return "----invalid name" # とりあえずなさそうな名前を返す
         return self.__class__.__name__ + '.' + self.problem_id + '/test_out/' + self.testcase_names[index]
 
     def get_url(self):
         return "http://yukicoder.me/problems/no/%s/testcase.zip" % self.problem_id
 
+    def extract_member(self, z, name, path):
+        directory = os.path.dirname(path)
+        with z.open(name) as src, tempfile.NamedTemporaryFile(dir=directory, prefix='.' + os.path.basename(path) + '.', delete=False) as dst:
+            try:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            except:
+                os.remove(dst.name)
+                raise
+        os.replace(dst.name, path)
+
     def download(self):
         if self.problem_id == "9999":
             return True
         try:
-            zipf = self.get_opener().open(self.get_url())
-            zipname = self.__class__.__name__ + '.' + self.problem_id + ".zip"
-            open(zipname, "w").write(zipf.read())
-            with zipfile.ZipFile(zipname) as z:
-                self.testcase_names = [os.path.basename(i) for i in z.namelist() if i[0:7]=="test_in"]
-                z.extractall(self.__class__.__name__ + '.' + self.problem_id)
-            return True
+            response = self.get_opener().open(self.get_url())
         except urllib.error.HTTPError as error:
             print(error)
             return False
+        # small archives stay in memory and large ones spill to a temporary file
+        with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as archive:
+            shutil.copyfileobj(response, archive, 1024 * 1024)
+            with zipfile.ZipFile(archive) as z:
+                # the case index comes from the central directory, so the members are not scanned
+                members = {}
+                for name in z.namelist():
+                    if name.endswith('/'):
+                        continue
+                    folder = name.split('/', 1)[0]
+                    if folder in ("test_in", "test_out"):
+                        members[folder, os.path.basename(name)] = name
+                self.testcase_names = sorted(basename for folder, basename in members if folder == "test_in" and ("test_out", basename) in members)
+                for folder in ("test_in", "test_out"):
+                    os.makedirs(os.path.join(self.get_testcase_directory(), folder), exist_ok=True)
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.extract_workers) as executor:
+                    futures = [executor.submit(self.extract_member, z, name, os.path.join(self.get_testcase_directory(), folder, basename))
+                               for (folder, basename), name in members.items()]
+                    for future in futures:
+                        future.result()
+        return True
 
     def get_source_file_name(self):
         if self.options.source_file_name:
@@ -865,13 +1842,14 @@ class TOPSIC(OnlineJudge):
     def get_url(self):
         return f"https://{self.host_name}.topsic.org/examinations/{self.examinations_id}/problem_detail/{self.problem_id}"
 
-    def get_opener(self):
-        if self.opener:
-            return self.opener
+    def get_problem_key(self):
+        return f'{self.__class__.__name__}.{self.host_name}.{self.examinations_id}.{self.problem_id}'
 
-        opener = OnlineJudge.get_opener(self)
+    def get_login_url(self):
+        return f'https://{self.host_name}.topsic.org/users/sign_in'
 
-        html = opener.open(f'https://{self.host_name}.topsic.org/users/sign_in').read().decode('utf-8')
+    def login(self):
+        html = self.opener.open(self.get_login_url()).read().decode('utf-8')
         # print(html)
         pattern = re.compile('<input type="hidden" name="authenticity_token" value="(.+?)" />')
         result = pattern.findall(html)
@@ -884,22 +1862,9 @@ class TOPSIC(OnlineJudge):
         postdata['user[password]'] = setting['password']
         # print(postdata)
         params = urllib.parse.urlencode(postdata).encode('utf-8')
-        p = opener.open(f'https://{self.host_name}.topsic.org/users/sign_in', params)
+        p = self.opener.open(self.get_login_url(), params)
         print('Login ... ' + str(p.getcode()))
-        return self.opener
+        return self.login_succeeded(p)
 
-    def download(self):
-        html = self.download_html().decode('utf-8')
-        if '<h3>Sample Input 1</h3>' in html:
-            html = html[html.find('<h3>Sample Input 1</h3>'):]
-        if 'Sample Input' in html:
-            html = html[html.find('Sample Input'):]
-        p = re.compile('<pre.*?>(.+?)</pre>', re.M | re.S | re.I)
-        result = p.findall(html)
-        n = len(result) // 2
-        for index in range(n):
-            input_file_name = self.get_input_file_path(index)
-            output_file_name = self.get_output_file_path(index)
-            open(input_file_name, 'w').write(self.format_pre(result[index * 2 + 0]))
-            open(output_file_name, 'w').write(self.format_pre(result[index * 2 + 1]))
-        return True
+    def get_sample_extractor(self):
+        return SampleExtractor(['Sample Input 1', 'Sample Input'])
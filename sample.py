@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import html.parser
+
+
+class SampleExtractor(html.parser.HTMLParser):
+    # collects the text of <pre> elements in one pass over the page. the tokenizer decodes the entities.
+    # markers select the section with the samples. each marker moves the start to its first occurrence
+    # after the previous marker, and missing markers are skipped. with last, the last occurrence is used.
+    # a marker starting with '.' matches the class of an element and the others match text.
+    def __init__(self, markers=(), pre_class=None, last=False):
+        html.parser.HTMLParser.__init__(self, convert_charrefs=True)
+        self.markers = list(markers)
+        self.pre_class = pre_class
+        self.last = last
+        # ('marker', index of the marker) or ('pre', text) in the order of the page
+        self.events = []
+        self.pre = None
+
+    def handle_starttag(self, tag, attrs):
+        classes = (dict(attrs).get('class') or '').split()
+        for index, marker in enumerate(self.markers):
+            if marker.startswith('.') and marker[1:] in classes:
+                self.events.append(('marker', index))
+        if tag == 'pre' and self.pre is None and (self.pre_class is None or self.pre_class in classes):
+            self.pre = []
+        elif tag == 'br' and self.pre is not None:
+            self.pre.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag == 'pre' and self.pre is not None:
+            self.events.append(('pre', ''.join(self.pre)))
+            self.pre = None
+
+    def handle_data(self, data):
+        if self.pre is not None:
+            self.pre.append(data)
+        for index, marker in enumerate(self.markers):
+            if not marker.startswith('.') and marker in data:
+                self.events.append(('marker', index))
+
+    # parses the page and returns the samples.
+    # the part before the first <pre> or marker has no events, so the tokenizer starts at the tag before it.
+    def extract(self, page):
+        positions = [page.find(text) for text in ['<pre'] + [marker.lstrip('.') for marker in self.markers]]
+        positions = [position for position in positions if position >= 0]
+        start = max(0, page.rfind('<', 0, min(positions))) if positions else len(page)
+        self.feed(page[start:])
+        self.close()
+        return self.get_samples()
+
+    # returns [(input, output), ...]
+    def get_samples(self):
+        start = 0
+        for index in range(len(self.markers)):
+            positions = [position for position, event in enumerate(self.events) if position >= start and event == ('marker', index)]
+            if positions:
+                start = positions[-1] if self.last else positions[0]
+        texts = [text for kind, text in self.events[start:] if kind == 'pre']
+        return list(zip(texts[0::2], texts[1::2]))
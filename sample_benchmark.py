@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# compares the sample extraction of SampleExtractor with the former regex based one on saved problem pages.
+# the pages are named <judge class>.<anything>.html, e.g. AtCoder.abc300_a.html or AOJ.0001.html.
+import argparse
+import glob
+import os.path
+import re
+import time
+
+import onlinejudge
+
+
+def legacy_format_pre(s):
+    s = s.replace('<br />', '\n')
+    s = s.replace('&lt;', '<')
+    s = s.replace('&gt;', '>')
+    s = s.replace('&quot;', '"')
+    s = s.replace('\r', '')
+    if not s.endswith('\n'):
+        s += '\n'
+    while s.endswith('\n\n'):
+        s = s[0:len(s) - 1]
+    while s.startswith('\n'):
+        s = s[1:]
+    return s
+
+def legacy_extract(page, extractor):
+    for marker in extractor.markers:
+        if marker.startswith('.'):
+            marker = 'class="%s"' % marker[1:]
+        if marker in page:
+            page = page[page.rfind(marker) if extractor.last else page.find(marker):]
+    if extractor.pre_class is not None:
+        p = re.compile('<pre class="%s">(.+?)</pre>' % extractor.pre_class, re.M | re.S | re.I)
+    else:
+        p = re.compile('<pre.*?>(.+?)</pre>', re.M | re.S | re.I)
+    result = p.findall(page)
+    return [(legacy_format_pre(result[index * 2]), legacy_format_pre(result[index * 2 + 1])) for index in range(len(result) // 2)]
+
+def extract(page, extractor):
+    return [(format_pre(input_text), format_pre(output_text)) for input_text, output_text in extractor.extract(page)]
+
+def format_pre(s):
+    return onlinejudge.OnlineJudge.format_pre(None, s)
+
+def measure(function, page, judge, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        samples = function(page, judge.get_sample_extractor())
+    return (time.perf_counter() - start) / repeat, samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', help='Directory of the saved pages')
+    parser.add_argument('-n', '--repeat', type=int, default=100, help='Number of extractions per page')
+    options = parser.parse_args()
+
+    print('%-40s %-8s %-12s %-12s %s' % ('page', 'samples', 'regex', 'extractor', 'same'))
+    for path in sorted(glob.glob(os.path.join(options.directory, '*.html'))):
+        name = os.path.basename(path)
+        judge_class = getattr(onlinejudge, name.split('.')[0], None)
+        if not isinstance(judge_class, type) or not issubclass(judge_class, onlinejudge.OnlineJudge):
+            print('%-40s unknown judge' % name)
+            continue
+        # get_sample_extractor does not depend on the state of the judge
+        judge = judge_class.__new__(judge_class)
+        page = open(path, 'rb').read().decode('utf-8', 'replace')
+        legacy_time, legacy_samples = measure(legacy_extract, page, judge, options.repeat)
+        extractor_time, samples = measure(extract, page, judge, options.repeat)
+        print('%-40s %-8d %-12.6f %-12.6f %s' % (name, len(samples), legacy_time, extractor_time, 'yes' if samples == legacy_samples else 'no'))
+
+if __name__ == '__main__':
+    main()
@@ -1,63 +1,550 @@
 #!/usr/bin/env python3
+import concurrent.futures
+import hashlib
 import os
 import os.path
 import platform
+import re
+import shutil
+import signal
+import sys
 import subprocess
+import tempfile
+import threading
 import time
 
+from testcase import *
+
+launcher_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'launcher.py')
+
+# the programs run in their own sessions, so they do not get the SIGINT of Ctrl-C.
+# the running ones are tracked so that they can be killed when oj.py is interrupted.
+running_processes = set()
+running_processes_lock = threading.Lock()
+interrupted = threading.Event()
+
+def kill_process_group(pid):
+    try:
+        if platform.system() == 'Windows':
+            subprocess.call(['taskkill', '/F', '/T', '/PID', str(pid)], stdout=subprocess.DEVNULL)
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+# kills the program and its launcher
+def kill_process(p):
+    kill_process_group(p.program_pid)
+    if p.program_pid != p.pid:
+        kill_process_group(p.pid)
+
+def kill_running_processes():
+    # programs started after this are killed at once
+    with running_processes_lock:
+        interrupted.set()
+        for p in running_processes:
+            kill_process(p)
+
+
+# SIGTERM and SIGHUP (the terminal was closed) end oj.py like Ctrl-C, so that the running programs are
+# killed and the work directories are removed on the way out.
+def exit_on_signal(signum, frame):
+    raise SystemExit(128 + signum)
+
+def install_signal_handlers():
+    for name in ('SIGTERM', 'SIGHUP'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), exit_on_signal)
+
+
+class SolutionExecutor(concurrent.futures.ThreadPoolExecutor):
+    # on an exception such as KeyboardInterrupt, the running programs are killed and the queued runs are
+    # cancelled before waiting for the workers.
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            kill_running_processes()
+            self.shutdown(wait=True, cancel_futures=True)
+            return False
+        return concurrent.futures.ThreadPoolExecutor.__exit__(self, exc_type, exc_value, traceback)
+
+
+def create_work_directory(executable=False):
+    # prefer tmpfs. /dev/shm is often mounted noexec, so binaries go to the default temporary directory in that case.
+    shm = '/dev/shm'
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        if not executable or not os.statvfs(shm).f_flag & getattr(os, 'ST_NOEXEC', 0):
+            return tempfile.mkdtemp(prefix='oj.', dir=shm)
+    return tempfile.mkdtemp(prefix='oj.')
+
+
+class InteractionResult:
+    def __init__(self, solution_result, judge_result, round_trips, latencies):
+        self.solution_result = solution_result
+        self.judge_result = judge_result
+        self.round_trips = round_trips
+        # seconds from each message of the judge to the next reply of the solution
+        self.latencies = latencies
+
+
+def run_interactive(solution, judge, arguments, transcript_file_path, time_limit=None, memory_limit=None, judge_error_file_path=None):
+    # the judge gets the arguments. the outputs of each side are relayed to the other side as soon as they arrive.
+    transcript = []
+    latencies = []
+    pending_query = [None]
+    lock = threading.Lock()
+
+    def relay(source, destination, direction):
+        while True:
+            try:
+                data = os.read(source.fileno(), 1 << 16)
+            except OSError:
+                data = b''
+            if not data:
+                break
+            now = time.time()
+            try:
+                os.write(destination.fileno(), data)
+            except OSError:
+                # the other side has exited
+                pass
+            with lock:
+                transcript.append((now, direction, data))
+                if direction == 'judge':
+                    if pending_query[0] is None:
+                        pending_query[0] = now
+                elif pending_query[0] is not None:
+                    latencies.append(now - pending_query[0])
+                    pending_query[0] = None
+        for f in (source, destination):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    processes = []
+    try:
+        with open(judge_error_file_path if judge_error_file_path else os.devnull, 'w') as judge_stderr:
+            start_time = time.time()
+            solution_process = solution.start(subprocess.PIPE, subprocess.PIPE, bufsize=0)
+            processes.append(solution_process)
+            judge_process = judge.start(subprocess.PIPE, subprocess.PIPE, judge_stderr, arguments, bufsize=0)
+            processes.append(judge_process)
+        solution_timer, solution_timed_out = solution.start_timer(solution_process, time_limit)
+        # the judge only has to outlive the solution
+        judge_wall_time_limit = solution.get_wall_time_limit(time_limit) + 10.0 if time_limit is not None else None
+        judge_timer, judge_timed_out = judge.start_timer(judge_process, None, judge_wall_time_limit)
+        threads = [threading.Thread(target=relay, args=(judge_process.stdout, solution_process.stdin, 'judge')),
+                   threading.Thread(target=relay, args=(solution_process.stdout, judge_process.stdin, 'solution'))]
+        for thread in threads:
+            thread.start()
+        solution_result = solution.finish(solution_process, start_time, solution_timer, solution_timed_out, time_limit, memory_limit)
+        judge_result = judge.finish(judge_process, start_time, judge_timer, judge_timed_out, None, None)
+        for thread in threads:
+            thread.join()
+    except BaseException:
+        # neither side may outlive the interaction
+        for p in processes:
+            kill_process(p)
+        raise
+
+    with open(transcript_file_path, 'w') as f:
+        for now, direction, data in transcript:
+            for line in data.decode('utf-8', 'replace').splitlines():
+                if not line:
+                    continue
+                f.write('%10.6f %-8s %s\n' % (now - start_time, direction + '>', line))
+    return InteractionResult(solution_result, judge_result, len(latencies), latencies)
+
+
+class ExecutionResult:
+    def __init__(self, status, wall_time, cpu_time, memory, returncode, matched=None):
+        self.status = status
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        # peak resident set size in bytes. None if it is not available.
+        self.memory = memory
+        self.returncode = returncode
+        # True if the output was the same as the expected output. None if it was not compared while running.
+        self.matched = matched
+
+
 class Solution:
+    compiler_versions = {}
+    compiler_versions_lock = threading.Lock()
+    compile_cache_max_size = 256 * 1024 * 1024
+    # files with these extensions next to the source may be compiled with it, e.g. modules and local headers
+    dependency_extensions = ()
+
     def __init__(self, source_file_name):
         self.source_file_name = source_file_name
+        self.compile_cache_directory = None
+        self.work_directory = None
+    def get_work_directory(self):
+        if self.work_directory is None:
+            self.work_directory = create_work_directory(executable=True)
+        return self.work_directory
+    def cleanup(self):
+        if self.work_directory is not None:
+            shutil.rmtree(self.work_directory, ignore_errors=True)
+            self.work_directory = None
     def compile(self):
+        command_line = self.get_compile_command_line()
+        cache_path = self.get_compile_cache_path(command_line)
+        artifact_name = self.get_compile_artifact_name()
+        if cache_path is not None and os.path.exists(cache_path):
+            print('using the cached binary')
+            # the modification time orders the entries for eviction
+            os.utime(cache_path)
+            if os.path.isdir(cache_path):
+                shutil.copytree(cache_path, artifact_name, dirs_exist_ok=True)
+            else:
+                shutil.copy2(cache_path, artifact_name)
+            return True
+        if subprocess.call(command_line, env=self.get_compile_env()) != 0:
+            return False
+        if cache_path is not None and os.path.exists(artifact_name):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temporary_path = '%s.%d.%d.tmp' % (cache_path, os.getpid(), threading.get_ident())
+            try:
+                if os.path.isdir(artifact_name):
+                    shutil.copytree(artifact_name, temporary_path)
+                else:
+                    shutil.copy2(artifact_name, temporary_path)
+                os.replace(temporary_path, cache_path)
+            except OSError:
+                # another process has stored the same entry.
+                shutil.rmtree(temporary_path, ignore_errors=True)
+            self.evict_compile_cache()
+        return True
+    def evict_compile_cache(self):
+        # the least recently used binaries are removed until the cache fits in compile_cache_max_size
+        entries = []
+        for name in os.listdir(self.compile_cache_directory):
+            path = os.path.join(self.compile_cache_directory, name)
+            if name.endswith('.tmp'):
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+                if os.path.isdir(path):
+                    size = sum(os.path.getsize(os.path.join(root, file_name)) for root, dirs, files in os.walk(path) for file_name in files)
+                else:
+                    size = os.path.getsize(path)
+            except OSError:
+                continue
+            entries.append((mtime, size, path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.compile_cache_max_size:
+                break
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+    def get_compile_command_line(self):
         raise NotImplementedError
-    def execute(self, input_file_path, output_file_path):
-        start_time = time.time()
-        p = subprocess.Popen(self.get_execute_command_line(),
-                             stdin=open(input_file_path, 'r'),
-                             stdout=open(output_file_path, 'w'),
-                             env=self.get_execute_env())
-        if p.wait() != 0:
-            print('RuntimeError?')
-            exit(-1)
+    def get_compile_env(self):
+        return os.environ
+    def get_compile_artifact_name(self):
+        # the file or directory produced by the compiler. None disables the compile cache.
+        return None
+    def get_compiler_version_command_line(self):
+        return [self.get_compile_command_line()[0], '--version']
+    def get_compiler_version(self):
+        command_line = self.get_compiler_version_command_line()
+        key = tuple(command_line)
+        with Solution.compiler_versions_lock:
+            if key not in Solution.compiler_versions:
+                try:
+                    p = subprocess.run(command_line, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=self.get_compile_env())
+                    Solution.compiler_versions[key] = p.stdout
+                except OSError:
+                    Solution.compiler_versions[key] = None
+            return Solution.compiler_versions[key]
+    def get_compile_cache_path(self, command_line):
+        artifact_name = self.get_compile_artifact_name()
+        if self.compile_cache_directory is None or artifact_name is None:
+            return None
+        compiler_version = self.get_compiler_version()
+        if compiler_version is None:
+            return None
+        dependencies = self.get_compile_dependencies()
+        if dependencies is None:
+            return None
+        h = hashlib.sha256()
+        directory = os.path.dirname(self.source_file_name)
+        for path in dependencies:
+            try:
+                data = open(path, 'rb').read()
+            except OSError:
+                return None
+            h.update(os.path.relpath(path, directory or os.curdir).encode('utf-8') + b'\0' + data + b'\0')
+        for arg in command_line:
+            # the artifact name and the work directory must not change the key.
+            arg = arg.replace(artifact_name, '<artifact>')
+            if self.work_directory is not None:
+                arg = arg.replace(self.work_directory, '<work>')
+            h.update(b'\0' + arg.encode('utf-8'))
+        h.update(b'\0' + compiler_version)
+        return os.path.join(self.compile_cache_directory, h.hexdigest())
+    # returns the files the binary is built from, the source first. None if they are not known.
+    def get_compile_dependencies(self):
+        directory = os.path.dirname(self.source_file_name) or os.curdir
+        dependencies = [self.source_file_name]
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name.endswith(self.dependency_extensions) and os.path.isfile(path) and not os.path.samefile(path, self.source_file_name):
+                dependencies.append(path)
+        return dependencies
+    def get_included_files(self):
+        # gcc -MM lists the source and the included files except the system headers
+        command_line = self.get_compile_command_line()
+        index = command_line.index('-o')
+        del command_line[index:index + 2]
+        p = subprocess.run(command_line + ['-MM'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=self.get_compile_env())
+        if p.returncode != 0:
+            return None
+        rule = p.stdout.decode('utf-8', 'replace').replace('\\\n', ' ')
+        target, separator, prerequisites = rule.partition(': ')
+        return [path.replace('\\ ', ' ') for path in re.findall(r'(?:\\ |\S)+', prerequisites)]
+    def execute(self, input_file_path, output_file_path, time_limit=None, memory_limit=None, arguments=(), error_file_path=None, expected_file_path=None, output_limit=None):
+        # with expected_file_path or output_limit, the output is read through a pipe and checked while the program runs.
+        # the program is killed at the first mismatch (WA) or when the output exceeds output_limit bytes (OLE).
+        # input_file_path and expected_file_path may also be functions that open the data, see testcase.open_data.
+        # such input is written to the stdin pipe by a thread.
+        streaming = expected_file_path is not None or output_limit is not None
+        feeding = callable(input_file_path)
+        matched = None
+        aborted = None
+        with open_data(input_file_path) as stdin, open(output_file_path, 'wb') as stdout, \
+                open(error_file_path if error_file_path else os.devnull, 'w') as stderr:
+            start_time = time.time()
+            p = self.start(subprocess.PIPE if feeding else stdin, subprocess.PIPE if streaming else stdout, stderr if error_file_path else None, arguments)
+            if feeding:
+                feeder = threading.Thread(target=self.feed, args=(p, stdin))
+                feeder.start()
+            timer, timed_out = self.start_timer(p, time_limit)
+            if streaming:
+                matched, aborted = self.capture(p, stdout, expected_file_path, output_limit)
+            result = self.finish(p, start_time, timer, timed_out, time_limit, memory_limit, aborted, matched)
+            if feeding:
+                feeder.join()
+        return result
+    def feed(self, p, input_file):
+        try:
+            for chunk in iter(lambda: input_file.read(1 << 16), b''):
+                p.stdin.write(chunk)
+        except (BrokenPipeError, OSError, ValueError):
+            # the program exited without reading the whole input
+            pass
+        finally:
+            try:
+                p.stdin.close()
+            except OSError:
+                pass
+    def start(self, stdin, stdout, stderr=None, arguments=(), bufsize=-1):
+        command_line = self.get_execute_command_line() + list(arguments)
+        report = None
+        pass_fds = ()
+        if hasattr(os, 'wait4'):
+            # the launcher measures the program without the memory of this process, see launcher.py
+            report, report_writer = os.pipe()
+            command_line = [sys.executable, '-I', '-S', launcher_path, str(report_writer)] + command_line
+            pass_fds = (report_writer,)
+        try:
+            p = subprocess.Popen(command_line,
+                                 stdin=stdin,
+                                 stdout=stdout,
+                                 stderr=stderr,
+                                 env=self.get_execute_env(),
+                                 bufsize=bufsize,
+                                 start_new_session=True,
+                                 pass_fds=pass_fds)
+        except:
+            if report is not None:
+                os.close(report)
+            raise
+        finally:
+            if report is not None:
+                os.close(report_writer)
+        p.report = report
+        p.report_data = b''
+        p.program_pid = p.pid
+        with running_processes_lock:
+            running_processes.add(p)
+        if report is not None:
+            # the launcher reports the pid of the program first
+            line = self.read_report(p)
+            if line:
+                p.program_pid = int(line[0])
+        if interrupted.is_set():
+            kill_process(p)
+        return p
+    # returns the next line of the report of the launcher as a list of fields
+    def read_report(self, p):
+        while b'\n' not in p.report_data:
+            chunk = os.read(p.report, 4096)
+            if not chunk:
+                break
+            p.report_data += chunk
+        line, separator, p.report_data = p.report_data.partition(b'\n')
+        return line.split()
+    def start_timer(self, p, time_limit, wall_time_limit=None):
+        timed_out = threading.Event()
+        if wall_time_limit is None:
+            if time_limit is None:
+                return None, timed_out
+            # the wall clock limit only catches sleeping or blocked processes. a program that is killed by it
+            # within the cpu time limit is reported as WLE, not TLE, because it may only have waited for the cpu.
+            wall_time_limit = self.get_wall_time_limit(time_limit)
+        def kill():
+            timed_out.set()
+            self.kill(p)
+        timer = threading.Timer(wall_time_limit, kill)
+        timer.start()
+        return timer, timed_out
+    def finish(self, p, start_time, timer, timed_out, time_limit, memory_limit, aborted=None, matched=None):
+        returncode, wall_time, cpu_time, memory = self.wait(p)
         end_time = time.time()
-        return end_time - start_time
+        if timer is not None:
+            timer.cancel()
+        if wall_time is None:
+            wall_time = end_time - start_time
+        if cpu_time is None:
+            cpu_time = wall_time
+        # a run that exceeded a limit is reported as such even if its output went wrong before
+        if time_limit is not None and cpu_time > time_limit:
+            status = 'TLE'
+        elif timed_out.is_set():
+            # without a time limit, the given wall clock limit is the only limit
+            status = 'TLE' if time_limit is None else 'WLE'
+        elif memory_limit is not None and memory is not None and memory > memory_limit:
+            status = 'MLE'
+        elif aborted is not None:
+            status = aborted
+        elif returncode != 0:
+            status = 'RE'
+        else:
+            status = 'OK'
+        return ExecutionResult(status, wall_time, cpu_time, memory, returncode, matched)
+    # copies the output of p to output_file. returns (matched, aborted).
+    # matched is None without expected_file_path. aborted is 'WA' or 'OLE' if p has been killed.
+    def capture(self, p, output_file, expected_file_path, output_limit):
+        expected_file = open_data(expected_file_path) if expected_file_path is not None else None
+        size = 0
+        try:
+            while True:
+                chunk = p.stdout.read1(1 << 16)
+                if not chunk:
+                    break
+                output_file.write(chunk)
+                size += len(chunk)
+                if output_limit is not None and size > output_limit:
+                    self.kill(p)
+                    return (False if expected_file else None), 'OLE'
+                if expected_file is not None and read_exactly(expected_file, len(chunk)) != chunk:
+                    self.kill(p)
+                    return False, 'WA'
+            if expected_file is None:
+                return None, None
+            return expected_file.read(1) == b'', None
+        finally:
+            p.stdout.close()
+            if expected_file is not None:
+                expected_file.close()
+    # returns (returncode, wall_time, cpu_time, memory). the values that are not measured are None.
+    def wait(self, p):
+        try:
+            if not hasattr(os, 'wait4'):
+                return p.wait(), None, None, None
+            pid, status, rusage = os.wait4(p.pid, 0)
+            p.returncode = os.waitstatus_to_exitcode(status)
+            # the launcher has exited, so its report is in the pipe. it reports nothing when it has been killed.
+            report = self.read_report(p)
+        except BaseException:
+            # Ctrl-C while waiting in the main thread
+            kill_process(p)
+            p.wait()
+            raise
+        finally:
+            if p.report is not None:
+                os.close(p.report)
+            with running_processes_lock:
+                running_processes.discard(p)
+        if len(report) != 4:
+            return p.returncode, None, None, None
+        status, wall_time, cpu_time, memory = int(report[0]), float(report[1]), float(report[2]), int(report[3])
+        p.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+        if platform.system() != 'Darwin':
+            memory *= 1024
+        return p.returncode, wall_time, cpu_time, memory
+    def kill(self, p):
+        # the launcher survives and reports the usage of the killed program
+        kill_process_group(p.program_pid)
+    def get_wall_time_limit(self, time_limit):
+        # programs that run in parallel share the cpus, so each of them gets less of the wall clock
+        with running_processes_lock:
+            running = len(running_processes)
+        if hasattr(os, 'sched_getaffinity'):
+            cpus = len(os.sched_getaffinity(0))
+        else:
+            cpus = os.cpu_count() or 1
+        return max(time_limit * 2.0, time_limit + 1.0) * max(1.0, running / cpus)
     def get_execute_command_line(self):
         raise NotImplementedError
     def get_execute_env(self):
         return os.environ
     def get_a_out_name(self):
         if platform.system() == 'Windows':
-            return 'a.exe'
+            return os.path.join(self.get_work_directory(), 'a.exe')
         else:
-            return 'a.out'
+            return os.path.join(self.get_work_directory(), 'a.out')
 
 
 class SolutionC(Solution):
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
-    def compile(self):
-        return subprocess.call(['gcc', '-O2', '-o', self.get_a_out_name(), '-Wno-deprecated', '-Wall', '-std=gnu11', self.source_file_name]) == 0
+    def get_compile_dependencies(self):
+        return self.get_included_files()
+    def get_compile_command_line(self):
+        return ['gcc', '-O2', '-o', self.get_a_out_name(), '-Wno-deprecated', '-Wall', '-std=gnu11', self.source_file_name]
+    def get_compile_artifact_name(self):
+        return self.get_a_out_name()
     def get_execute_command_line(self):
-        return ['./' + self.get_a_out_name()]
+        return [self.get_a_out_name()]
 
 
 class SolutionCxx(Solution):
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
-    def compile(self):
-        return subprocess.call(['g++', '-O2', '-o', self.get_a_out_name(), '-Wno-deprecated', '-Wall', '-std=gnu++17', self.source_file_name]) == 0
+    def get_compile_dependencies(self):
+        return self.get_included_files()
+    def get_compile_command_line(self):
+        return ['g++', '-O2', '-o', self.get_a_out_name(), '-Wno-deprecated', '-Wall', '-std=gnu++17', self.source_file_name]
+    def get_compile_artifact_name(self):
+        return self.get_a_out_name()
     def get_execute_command_line(self):
-        return ['./' + self.get_a_out_name()]
+        return [self.get_a_out_name()]
 
 
 class SolutionJava(Solution):
+    dependency_extensions = ('.java',)
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
     def compile(self):
-        return subprocess.call(['javac', self.source_file_name]) == 0
+        os.makedirs(self.get_compile_artifact_name(), exist_ok=True)
+        return Solution.compile(self)
+    def get_compile_command_line(self):
+        return ['javac', '-d', self.get_compile_artifact_name(), self.source_file_name]
+    def get_compile_artifact_name(self):
+        return os.path.join(self.get_work_directory(), 'classes')
     def get_execute_command_line(self):
-        class_name = self.source_file_name.split('.')[0]
-        return ['java', '-Xmx256m', class_name]
+        class_name = os.path.basename(self.source_file_name).split('.')[0]
+        return ['java', '-Xmx256m', '-cp', self.get_compile_artifact_name(), class_name]
 
 
 class SolutionIo(Solution):
@@ -173,53 +660,82 @@ class SolutionRubyTopaz(Solution):
 
 
 class SolutionHaskell(Solution):
+    dependency_extensions = ('.hs', '.lhs')
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
-    def compile(self):
-        return subprocess.call(['ghc', '-o', self.get_a_out_name(), self.source_file_name]) == 0
+    def get_compile_command_line(self):
+        return ['ghc', '-outputdir', self.get_work_directory(), '-o', self.get_a_out_name(), self.source_file_name]
+    def get_compile_artifact_name(self):
+        return self.get_a_out_name()
     def get_execute_command_line(self):
-        return ['./' + self.get_a_out_name()]
+        return [self.get_a_out_name()]
 
 class SolutionScala(Solution):
+    dependency_extensions = ('.scala',)
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
     def get_execute_env(self):
         env=os.environ.copy()
         env['SCALAENV_VERSION']='scala-2.13.1'
+    def get_compile_env(self):
+        return self.get_execute_env()
     def compile(self):
-        return subprocess.call(['scalac', self.source_file_name],env=self.get_execute_env()) == 0
+        os.makedirs(self.get_compile_artifact_name(), exist_ok=True)
+        return Solution.compile(self)
+    def get_compile_command_line(self):
+        return ['scalac', '-d', self.get_compile_artifact_name(), self.source_file_name]
+    def get_compile_artifact_name(self):
+        return os.path.join(self.get_work_directory(), 'classes')
     def get_execute_command_line(self):
-        return ['scala',"-J-Xmx1024m","Main"]
+        return ['scala',"-J-Xmx1024m","-cp",self.get_compile_artifact_name(),"Main"]
 
 class SolutionCs(Solution):
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
-    def compile(self):
-        s=subprocess.check_output(['cygpath', '-w', self.source_file_name]).rstrip()
-        return subprocess.call(['csc', '/out:a.exe', s]) == 0
+    def get_compile_command_line(self):
+        s=subprocess.check_output(['cygpath', '-w', self.source_file_name]).rstrip().decode('utf-8')
+        out=subprocess.check_output(['cygpath', '-w', self.get_compile_artifact_name()]).rstrip().decode('utf-8')
+        return ['csc', '/out:' + out, s]
+    def get_compile_artifact_name(self):
+        return os.path.join(self.get_work_directory(), 'a.exe')
+    def get_compiler_version_command_line(self):
+        return ['csc', '/version']
     def get_execute_command_line(self):
-        return ['./a.exe']
+        return [self.get_compile_artifact_name()]
 
 class SolutionGo(Solution):
+    dependency_extensions = ('.go',)
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
-    def compile(self):
-        return subprocess.call(['go', 'build', '-o', 'a.out', self.source_file_name]) == 0
+    def get_compile_command_line(self):
+        return ['go', 'build', '-o', self.get_compile_artifact_name(), self.source_file_name]
+    def get_compile_artifact_name(self):
+        return os.path.join(self.get_work_directory(), 'a.out')
+    def get_compiler_version_command_line(self):
+        return ['go', 'version']
     def get_execute_command_line(self):
-        return ['./a.out']
+        return [self.get_compile_artifact_name()]
 
 class SolutionD(Solution):
+    dependency_extensions = ('.d', '.di')
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
-    def compile(self):
-        return subprocess.call(['dmd', '-m64', '-w', '-wi', '-O', '-release', '-inline', '-ofa.out', self.source_file_name]) == 0
+    def get_compile_command_line(self):
+        return ['dmd', '-m64', '-w', '-wi', '-O', '-release', '-inline', '-od' + self.get_work_directory(), '-of' + self.get_compile_artifact_name(), self.source_file_name]
+    def get_compile_artifact_name(self):
+        return os.path.join(self.get_work_directory(), 'a.out')
     def get_execute_command_line(self):
-        return ['./a.out']
+        return [self.get_compile_artifact_name()]
 
 class SolutionOCaml(Solution):
+    dependency_extensions = ('.ml', '.mli')
     def __init__(self, source_file_name):
         Solution.__init__(self, source_file_name)
-    def compile(self):
-        return subprocess.call(['ocamlc', '-o', self.get_a_out_name(), self.source_file_name]) == 0
+    def get_compile_command_line(self):
+        return ['ocamlc', '-o', self.get_a_out_name(), self.source_file_name]
+    def get_compile_artifact_name(self):
+        return self.get_a_out_name()
+    def get_compiler_version_command_line(self):
+        return ['ocamlc', '-version']
     def get_execute_command_line(self):
-        return ['./' + self.get_a_out_name()]
+        return [self.get_a_out_name()]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+import functools
+import gzip
+import hashlib
+import io
+import json
+import os
+import os.path
+import shutil
+import tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# test data is passed around as a path or as a function that opens it as a binary file.
+def open_data(data):
+    if callable(data):
+        return data()
+    return open(data, 'rb')
+
+# returns a path of the data. data that is not a file yet is written to path.
+def materialize(data, path):
+    if not callable(data):
+        return data
+    with data() as src, open(path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    return path
+
+# reads n bytes unless the data ends first. a raw stream may return fewer bytes than asked.
+def read_exactly(f, n):
+    data = f.read(n)
+    while data and len(data) < n:
+        chunk = f.read(n - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+            size += len(chunk)
+    return size, h.hexdigest()
+
+
+# tells whether files exist with one listing per directory instead of a stat per file
+class DirectoryListing:
+    def __init__(self):
+        self.names = {}
+
+    def exists(self, path):
+        directory, name = os.path.split(os.path.normpath(path))
+        if directory not in self.names:
+            try:
+                self.names[directory] = set(os.listdir(directory or os.curdir))
+            except OSError:
+                self.names[directory] = set()
+        return name in self.names[directory]
+
+
+class TestCase:
+    def __init__(self, name, input_file_path, output_file_path, store=None, input_digest=None, output_digest=None):
+        self.name = name
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        # cases in a TestCaseStore have digests instead of paths
+        self.store = store
+        self.input_digest = input_digest
+        self.output_digest = output_digest
+
+    def get_input(self):
+        if self.input_digest is not None:
+            return functools.partial(self.store.open, self.input_digest)
+        return self.input_file_path
+
+    def get_output(self):
+        if self.output_digest is not None:
+            return functools.partial(self.store.open, self.output_digest)
+        return self.output_file_path
+
+    def has_output(self):
+        if self.store is not None:
+            return self.output_digest is not None
+        return self.output_file_path is not None and os.path.exists(self.output_file_path)
+
+
+class TestCaseStore:
+    # inputs and outputs are stored compressed under their sha256, so identical files are kept once.
+    # a manifest per problem lists the cases.
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get_manifest_path(self, problem):
+        return os.path.join(self.directory, 'manifests', problem + '.json')
+
+    def get_object_path(self, digest, extension):
+        return os.path.join(self.directory, 'objects', digest[:2], digest + extension)
+
+    def find(self, digest):
+        for extension in ('.zst', '.gz'):
+            path = self.get_object_path(digest, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, path):
+        extension = '.zst' if zstandard is not None else '.gz'
+        directory = os.path.join(self.directory, 'objects')
+        os.makedirs(directory, exist_ok=True)
+        # the data is hashed and compressed in one pass
+        fd, temporary_path = tempfile.mkstemp(dir=directory, prefix='.')
+        h = hashlib.sha256()
+        try:
+            with open(path, 'rb') as src, os.fdopen(fd, 'wb') as raw:
+                if zstandard is not None:
+                    dst = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+                else:
+                    dst = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0)
+                with dst:
+                    for chunk in iter(lambda: src.read(1 << 20), b''):
+                        h.update(chunk)
+                        dst.write(chunk)
+            digest = h.hexdigest()
+            if self.find(digest) is None:
+                object_path = self.get_object_path(digest, extension)
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(temporary_path, object_path)
+            else:
+                os.remove(temporary_path)
+        except:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return digest
+
+    def open(self, digest):
+        path = self.find(digest)
+        if path is None:
+            raise IOError('missing object ' + digest)
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise IOError('zstandard is needed to read ' + path)
+            # the reader may return fewer bytes than asked and cannot be iterated by lines
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True), 1 << 16)
+        return gzip.open(path, 'rb')
+
+    # returns None if the problem is not stored
+    def load(self, problem):
+        try:
+            with open(self.get_manifest_path(problem)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return [TestCase(case['name'], None, None, self, case['input'], case['output']) for case in manifest['cases']]
+
+    # stores the files of the cases that are not stored yet and writes the manifest
+    def save(self, problem, test_cases):
+        cases = []
+        for test_case in test_cases:
+            if test_case.store is self or test_case.input_digest is not None:
+                input_digest = test_case.input_digest
+                output_digest = test_case.output_digest
+            else:
+                input_digest = self.put(test_case.input_file_path)
+                output_digest = self.put(test_case.output_file_path) if test_case.has_output() else None
+            cases.append({'name': test_case.name, 'input': input_digest, 'output': output_digest})
+        path = self.get_manifest_path(problem)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'cases': cases}, f, indent=1)
+        os.replace(temporary_path, path)
+        return self.load(problem)
@@ -1,55 +1,276 @@
 #!/usr/bin/env python3
+import os
+import os.path
+import shutil
 import subprocess
 
+from solution import create_work_directory
+from testcase import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class Validator:
-    def validate(self, answer_path, output_path):
+    # quiet validators only return the result. they are used when many cases are compared at once.
+    verbose = True
+    exact = False
+    # prepare() is called once before the first validate() and cleanup() after the last one.
+    def prepare(self):
+        return True
+    def cleanup(self):
+        pass
+    # the messages are written to report. None means sys.stdout.
+    # answer_path and input_path may also be functions that open the data, see testcase.open_data.
+    def validate(self, answer_path, output_path, input_path=None, report=None):
         raise NotImplementedError
 
 
 class DiffValidator(Validator):
-    def validate(self, answer_path, output_path):
-        return subprocess.call(['diff', '-y', '-d', answer_path, output_path]) == 0
+    chunk_size = 1 << 20
+    # the output can be compared byte by byte while the solution is running
+    exact = True
+
+    def __init__(self, verbose=True, full_diff=False):
+        self.verbose = verbose
+        self.full_diff = full_diff
+
+    def validate(self, answer_path, output_path, input_path=None, report=None):
+        mismatch = self.find_mismatch(answer_path, output_path)
+        if mismatch is None:
+            return True
+        if not self.verbose:
+            return False
+        if self.full_diff:
+            with open_data(answer_path) as answer_file:
+                p = subprocess.run(['diff', '-y', '-d', '-', output_path], input=answer_file.read(), stdout=subprocess.PIPE)
+            print(p.stdout.decode('utf-8', 'replace'), end='', file=report)
+            return False
+        line, column = mismatch
+        print('first mismatch at line %d, column %d' % (line + 1, column + 1), file=report)
+        answer_lines = self.read_lines(answer_path, line - 1, line + 1)
+        output_lines = self.read_lines(output_path, line - 1, line + 1)
+        for i in range(max(len(answer_lines), len(output_lines))):
+            answer_line = answer_lines[i] if i < len(answer_lines) else b''
+            output_line = output_lines[i] if i < len(output_lines) else b''
+            separator = '|' if answer_line != output_line else ' '
+            print(('%-38s %s %s' % (self.format_line(answer_line, column), separator, self.format_line(output_line, column))), file=report)
+        return False
+
+    # returns None if the files are the same. otherwise returns (line, column) of the first different byte.
+    def find_mismatch(self, answer_path, output_path):
+        line = 0
+        line_start = 0
+        offset = 0
+        with open_data(answer_path) as answer_file, open(output_path, 'rb') as output_file:
+            while True:
+                answer_chunk = read_exactly(answer_file, self.chunk_size)
+                output_chunk = read_exactly(output_file, self.chunk_size)
+                if answer_chunk == output_chunk:
+                    if not answer_chunk:
+                        return None
+                    line += answer_chunk.count(b'\n')
+                    if b'\n' in answer_chunk:
+                        line_start = offset + answer_chunk.rindex(b'\n') + 1
+                    offset += len(answer_chunk)
+                    continue
+                # binary search of the first different byte
+                low = 0
+                high = min(len(answer_chunk), len(output_chunk))
+                while low < high:
+                    middle = (low + high) // 2
+                    if answer_chunk[low:middle + 1] == output_chunk[low:middle + 1]:
+                        low = middle + 1
+                    else:
+                        high = middle
+                same = answer_chunk[:low]
+                line += same.count(b'\n')
+                if b'\n' in same:
+                    line_start = offset + same.rindex(b'\n') + 1
+                return line, offset + low - line_start
+
+    def read_lines(self, path, first, last):
+        lines = []
+        with open_data(path) as f:
+            for index, line in enumerate(f):
+                if index > last:
+                    break
+                if index >= first:
+                    lines.append(line.rstrip(b'\r\n'))
+        return lines
+
+    def format_line(self, line, column):
+        # long lines are cut around the mismatch
+        text = line.decode('utf-8', 'replace')
+        if len(text) > 38:
+            start = max(0, min(column - 18, len(text) - 38))
+            text = text[start:start + 38]
+        return text
 
 
 class FloatingPointValidator(Validator):
     absolute_error = None
-    def __init__(self, absolute_error):
+    max_reported_mismatches = 10
+    def __init__(self, absolute_error, verbose=True):
         self.absolute_error = float(absolute_error)
         self.relative_error = float(absolute_error)
+        self.verbose = verbose
 
-    def validate(self, answer_path, output_path):
-        answer_file = open(answer_path)
-        output_file = open(output_path)
-        result = True
-        print(('%-25s %-25s   %-15s %s' % ('answer', 'output', 'diff', 'reldiff')))
-        while True:
-            answer_line = answer_file.readline()
-            output_line = output_file.readline()
+    def validate(self, answer_path, output_path, input_path=None, report=None):
+        # the outputs are compared token by token. any number of values per line is allowed.
+        with open_data(answer_path) as answer_file:
+            answer_tokens = answer_file.read().split()
+        output_tokens = open(output_path, 'rb').read().split()
+        n = min(len(answer_tokens), len(output_tokens))
+        if numpy is not None:
+            mismatches, max_diff, max_reldiff = self.compare_numpy(answer_tokens[:n], output_tokens[:n])
+        else:
+            mismatches, max_diff, max_reldiff = self.compare(answer_tokens[:n], output_tokens[:n])
+        result = not mismatches and len(answer_tokens) == len(output_tokens)
+        if not self.verbose:
+            return result
 
-            if answer_line == '' and output_line == '':
-                break
+        if mismatches:
+            print(('%-10s %-25s %-25s %-15s %s' % ('position', 'answer', 'output', 'diff', 'reldiff')), file=report)
+            lines = self.get_line_numbers(answer_path, mismatches[:self.max_reported_mismatches])
+            for index in mismatches[:self.max_reported_mismatches]:
+                answer_value = self.to_float(answer_tokens[index])
+                output_value = self.to_float(output_tokens[index])
+                if answer_value is None or output_value is None:
+                    diff = reldiff = float('nan')
+                else:
+                    diff = output_value - answer_value
+                    reldiff = diff / output_value if output_value else 1e9
+                print(('%-10s %-25s %-25s %-15e %e' % ('%d:%d' % (lines.get(index, 0) + 1, index + 1), answer_tokens[index].decode('utf-8', 'replace'), output_tokens[index].decode('utf-8', 'replace'), diff, reldiff)), file=report)
+            if len(mismatches) > self.max_reported_mismatches:
+                print('... %d more mismatches' % (len(mismatches) - self.max_reported_mismatches), file=report)
+        if len(answer_tokens) != len(output_tokens):
+            print('the number of tokens differs: answer %d, output %d' % (len(answer_tokens), len(output_tokens)), file=report)
+        print('%d values, %d mismatches, max diff %e, max reldiff %e' % (n, len(mismatches), max_diff, max_reldiff), file=report)
+        return result
+
+    def is_ok(self, diff, reldiff):
+        return abs(diff) < self.absolute_error or abs(reldiff) < self.relative_error
 
-            answer_line = answer_line.strip()
-            output_line = output_line.strip()
+    def to_float(self, token):
+        try:
+            return float(token)
+        except ValueError:
+            return None
 
-            answer_value = float(answer_line)
-            output_value = float(output_line)
-            ok = False
+    # returns (indices of the mismatches, max diff, max reldiff)
+    def compare(self, answer_tokens, output_tokens):
+        try:
+            answer_values = list(map(float, answer_tokens))
+            output_values = list(map(float, output_tokens))
+        except ValueError:
+            return self.compare_tokens(answer_tokens, output_tokens)
+        mismatches = []
+        max_diff = 0.0
+        max_reldiff = 0.0
+        absolute_error = self.absolute_error
+        relative_error = self.relative_error
+        for index, (answer_value, output_value) in enumerate(zip(answer_values, output_values)):
+            diff = abs(output_value - answer_value)
+            if output_value:
+                reldiff = diff / abs(output_value)
+                if reldiff > max_reldiff:
+                    max_reldiff = reldiff
+            else:
+                reldiff = 1e9
+            if diff > max_diff:
+                max_diff = diff
+            if not (diff < absolute_error or reldiff < relative_error):
+                mismatches.append(index)
+        return mismatches, max_diff, max_reldiff
+
+    def compare_tokens(self, answer_tokens, output_tokens):
+        mismatches = []
+        max_diff = 0.0
+        max_reldiff = 0.0
+        for index, (answer_token, output_token) in enumerate(zip(answer_tokens, output_tokens)):
+            answer_value = self.to_float(answer_token)
+            output_value = self.to_float(output_token)
+            if answer_value is None or output_value is None:
+                # tokens which are not numbers must be the same
+                if answer_token != output_token:
+                    mismatches.append(index)
+                continue
             diff = output_value - answer_value
             reldiff = diff / output_value if output_value else 1e9
+            max_diff = max(max_diff, abs(diff))
+            if output_value:
+                max_reldiff = max(max_reldiff, abs(reldiff))
+            if not self.is_ok(diff, reldiff):
+                mismatches.append(index)
+        return mismatches, max_diff, max_reldiff
 
-            if abs(diff) < self.absolute_error or abs(reldiff) < self.relative_error :
-                ok = True
+    def compare_numpy(self, answer_tokens, output_tokens):
+        try:
+            answer_values = numpy.array(list(map(float, answer_tokens)), dtype=numpy.float64)
+            output_values = numpy.array(list(map(float, output_tokens)), dtype=numpy.float64)
+        except ValueError:
+            # some tokens are not numbers
+            return self.compare_tokens(answer_tokens, output_tokens)
+        nonzero = output_values != 0.0
+        diff = numpy.abs(output_values - answer_values)
+        reldiff = diff / numpy.where(nonzero, numpy.abs(output_values), 1.0)
+        ok = (diff < self.absolute_error) | (nonzero & (reldiff < self.relative_error))
+        mismatches = numpy.flatnonzero(~ok).tolist()
+        with numpy.errstate(invalid='ignore'):
+            max_diff = float(numpy.nanmax(diff, initial=0.0))
+            max_reldiff = float(numpy.nanmax(numpy.where(nonzero, reldiff, 0.0), initial=0.0))
+        return mismatches, max_diff, max_reldiff
 
-#            if abs(answer_value) > absolute_error:
-#                if abs((answer_value - output_value) / answer_value) < relative_error:
-#                    ok = True
+    # maps the token indices to the line numbers of the file
+    def get_line_numbers(self, path, indices):
+        lines = {}
+        targets = sorted(indices)
+        position = 0
+        with open_data(path) as f:
+            for line_number, line in enumerate(f):
+                position += len(line.split())
+                while targets and targets[0] < position:
+                    lines[targets.pop(0)] = line_number
+                if not targets:
+                    break
+        return lines
 
-            separator = ' '
 
-            if not ok:
-                separator = '|'
-                result = False
+class CheckerValidator(Validator):
+    # testlib exit codes
+    verdicts = {0: 'ok', 1: 'wrong answer', 2: 'presentation error', 3: 'fail', 7: 'points'}
+    time_limit = 10.0
 
-            print(('%-25s %-25s %s %-15e %e' % (answer_line, output_line, separator, diff, reldiff)))
-        return result
+    def __init__(self, checker, verbose=True):
+        self.checker = checker
+        self.verbose = verbose
+
+    def prepare(self):
+        return self.checker.compile()
+
+    def cleanup(self):
+        self.checker.cleanup()
+
+    def validate(self, answer_path, output_path, input_path=None, report=None):
+        # checker <input> <output> <answer>, like testlib
+        # the scratch files of the checker go to tmpfs like those of the solutions
+        work_directory = create_work_directory()
+        try:
+            message_path = os.path.join(work_directory, 'message.txt')
+            # the checker reads files, so stored data is written out first
+            answer_path = materialize(answer_path, os.path.join(work_directory, 'answer.txt'))
+            input_path = materialize(input_path or os.devnull, os.path.join(work_directory, 'input.txt'))
+            result = self.checker.execute(os.devnull, os.path.join(work_directory, 'stdout.txt'), self.time_limit,
+                                          arguments=[input_path, output_path, answer_path],
+                                          error_file_path=message_path)
+            if self.verbose:
+                message = open(message_path, errors='replace').read().strip()
+                if result.status in ('TLE', 'WLE'):
+                    print('checker: time limit exceeded', file=report)
+                else:
+                    print(('checker: %s %s' % (self.verdicts.get(result.returncode, 'exit code %d' % result.returncode), message)).rstrip(), file=report)
+            return result.status == 'OK'
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)